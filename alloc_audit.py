@@ -0,0 +1,160 @@
+"""
+
+alloc_audit.py
+
+Contains the AllocationAudit class, which counts Python memory allocations per
+frame and finds where they come from, grouped by GameState.
+
+For each frame it records:
+    net blocks: change in sys.getallocatedblocks(), i.e. memory kept
+    kept blocks and bytes: blocks allocated during the frame and still alive
+        at its end (new Rects and tuples stored on sprites, for example)
+    peak bytes: the most memory the frame had allocated on top of what it
+        started with, which also counts short-lived objects freed within it
+
+Kept blocks are found by forgetting all traced blocks (tracemalloc.clear_traces)
+when the frame begins, so a snapshot at its end holds only the frame's own
+allocations, attributed to the line that made them. Pixel data allocated by SDL
+is not seen.
+
+Auditing slows frames down considerably; it is meant for headless runs.
+
+"""
+
+import sys
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+#ignore allocations made by the audit itself
+FILTERS = None if tracemalloc is None else [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, __file__),
+]
+
+
+def is_available():
+    return tracemalloc is not None and hasattr(tracemalloc, "reset_peak")
+
+
+
+class StateAllocations():
+    """Allocation totals for the frames spent in one GameState"""
+
+    def __init__(self, name):
+        self.name = name
+        self.frames = 0
+        self.net_blocks = 0
+        self.kept_blocks = 0
+        self.kept_bytes = 0
+        self.peak_bytes = 0
+
+        #dictionary from "file:line" to [blocks, bytes] kept
+        self.sites = {}
+
+
+    def add_frame(self, net_blocks, peak_bytes, statistics):
+        self.frames += 1
+        self.net_blocks += net_blocks
+        self.peak_bytes += peak_bytes
+
+        for stat in statistics:
+            frame = stat.traceback[0]
+            site = "{0}:{1}".format(frame.filename, frame.lineno)
+            totals = self.sites.setdefault(site, [0, 0])
+            totals[0] += stat.count
+            totals[1] += stat.size
+            self.kept_blocks += stat.count
+            self.kept_bytes += stat.size
+
+
+    def per_frame(self, total):
+        return total / float(self.frames) if self.frames else 0.0
+
+
+    def get_top_sites(self, top):
+        """Returns a list of (site, blocks per frame, bytes per frame),
+        most blocks first
+        """
+
+        ordered = sorted(self.sites.items(), key=lambda item: item[1][0], reverse=True)
+        return [(site, self.per_frame(blocks), self.per_frame(size))
+                for site, (blocks, size) in ordered[:top]]
+
+
+
+class AllocationAudit():
+    """Audits frames between begin_frame() and end_frame(state) calls.
+
+    top is the number of call sites listed per GameState in get_report().
+    """
+
+    def __init__(self, top):
+        self.top = top
+
+        #dictionary from GameState class name to StateAllocations
+        self.states = {}
+        self.blocks = 0
+        self.started = False
+
+
+    def start(self):
+        if not is_available():
+            raise RuntimeError("allocation audit needs tracemalloc with reset_peak (Python 3.9+)")
+
+        tracemalloc.start()
+        self.started = True
+
+
+    def stop(self):
+        if self.started:
+            tracemalloc.stop()
+            self.started = False
+
+
+    def begin_frame(self):
+        tracemalloc.clear_traces()
+        tracemalloc.reset_peak()
+        self.blocks = sys.getallocatedblocks()
+
+
+    def end_frame(self, state):
+        """Records the frame just run as spent in the GameState state"""
+
+        net_blocks = sys.getallocatedblocks() - self.blocks
+        peak_bytes = tracemalloc.get_traced_memory()[1]
+
+        snapshot = tracemalloc.take_snapshot().filter_traces(FILTERS)
+
+        name = type(state).__name__
+        allocations = self.states.get(name)
+        if allocations is None:
+            allocations = self.states[name] = StateAllocations(name)
+        allocations.add_frame(net_blocks, peak_bytes, snapshot.statistics("lineno"))
+
+
+    def get_state(self, name):
+        """Returns the StateAllocations for the named GameState, or None"""
+
+        return self.states.get(name)
+
+
+    def get_report(self):
+        """Returns the per-state totals and top call sites, one string per line"""
+
+        lines = []
+        for name in sorted(self.states):
+            allocations = self.states[name]
+            per_frame = allocations.per_frame
+            lines.append("{0}: {1} frames, per frame {2:.1f} net blocks, {3:.1f} kept blocks "
+                         "({4:.0f}B), {5:.0f}B peak".format(
+                             name, allocations.frames, per_frame(allocations.net_blocks),
+                             per_frame(allocations.kept_blocks), per_frame(allocations.kept_bytes),
+                             per_frame(allocations.peak_bytes)))
+
+            for site, blocks, size in allocations.get_top_sites(self.top):
+                lines.append("    {0:8.2f} blocks {1:8.0f}B  {2}".format(blocks, size, site))
+
+        return lines
@@ -4,6 +4,7 @@ import pygame
 from pygame import Surface, mask
 from pygame.sprite import Sprite
 
+import assets
 from asprite import ASprite
 from vector import NORTH, SOUTH, EAST, WEST, NORTHEAST, SOUTHEAST, NORTHWEST, SOUTHWEST, round_to_45
 
@@ -33,15 +34,21 @@ class AnimatedFacingSprite(ASprite):
         self.images, self.masks = split_frames(sprite_sheet, height, width)
         
         #by default, sprite appears in upper right, facing north at frame 0
+        self.rect = self.images[0][0].get_rect(topleft = (0, 0))
+        self.reset_animation()
+        
+        self.speed = speed
+
+
+    def reset_animation(self):
+        """faces north at the first frame of the animation"""
+
         self.image = self.images[0][0]
         self.mask = self.masks[0][0]
-        self.rect = self.image.get_rect(topleft = (0, 0))
         self.current_dir = NORTH
         self.current_frame = 0
         self.current_step = 0
         
-        self.speed = speed
-        
         
     def move(self, direction):
         """moves the sprite in the given direction
@@ -109,9 +116,18 @@ def split_frames(filename, height, width, single_row=False):
     
     returns a 2D list of Surfaces indexed [row][col]
     returns normal list when image file is one row and single_row is set to True
+
+    The result is cached and shared (see assets.py), so don't modify it
     """
     
-    parent = pygame.image.load(filename).convert_alpha()
+    return assets.load_sheet(filename, height, width, single_row)
+
+
+def split_sheet(parent, height, width, single_row=False):
+    """split_frames helper function
+    splits an already loaded parent surface; see split_frames
+    """
+
     parent_width, parent_height = parent.get_size()
     parent_rows = int(parent.get_height() / height)
     parent_cols = int(parent.get_width() / width)
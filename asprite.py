@@ -1,9 +1,9 @@
 
 
 import pygame
-from pygame import mask
 from pygame.sprite import Sprite
 
+import assets
 from vector import add, scale
 
 class ASprite(Sprite):
@@ -14,9 +14,9 @@ class ASprite(Sprite):
     
         Sprite.__init__(self)
         
-        self.image = pygame.image.load(sprite_filename).convert_alpha()
+        self.image = assets.load_image(sprite_filename)
         self.rect = self.image.get_rect()
-        self.mask = mask.from_surface(self.image)
+        self.mask = assets.load_mask(sprite_filename)
         
         self.speed = speed
         
@@ -30,6 +30,12 @@ class ASprite(Sprite):
     def draw(self, screen):
     
         screen.blit(self.image, self.rect)
+
+
+    def get_blits(self):
+        """Returns the (surface, position) pairs draw() would blit"""
+
+        return [(self.image, self.rect)]
         
         
     def get_rect(self):
@@ -0,0 +1,130 @@
+"""
+
+assets.py
+
+Process-wide cache for images, masks and split sprite sheets.
+
+Each file is loaded from disk and converted once; afterwards every caller gets
+the same Surface and Mask objects. These are shared, so they must be treated
+as immutable: never draw on a cached image or modify a cached mask.
+
+The display mode must be set before loading since images are converted.
+
+"""
+
+import pygame
+from pygame import mask
+
+#dictionaries from cache keys to loaded assets
+images = {}
+masks = {}
+sheets = {}
+
+#cache hit/miss counters, see get_stats()
+stats = {"hits": 0, "misses": 0}
+
+#sprite bundle to load into the cache on the first miss, see use_bundle()
+pending = {"bundle": None}
+
+
+def load_image(filename):
+    """Returns the converted (per-pixel alpha) Surface for filename"""
+
+    if filename not in images:
+        load_pending_bundle()
+
+    if filename in images:
+        stats["hits"] += 1
+        return images[filename]
+
+    stats["misses"] += 1
+    image = pygame.image.load(filename).convert_alpha()
+    images[filename] = image
+    return image
+
+
+def load_mask(filename):
+    """Returns the Mask of the image in filename"""
+
+    if filename not in masks:
+        load_pending_bundle()
+
+    if filename in masks:
+        stats["hits"] += 1
+        return masks[filename]
+
+    stats["misses"] += 1
+    image_mask = mask.from_surface(load_image(filename))
+    masks[filename] = image_mask
+    return image_mask
+
+
+def load_sheet(filename, height, width, single_row=False):
+    """Returns the (images, masks) of filename split into height x width frames.
+    See animated_facing_sprite.split_frames for the layout.
+    """
+
+    key = (filename, height, width, single_row)
+    if key not in sheets:
+        load_pending_bundle()
+
+    if key in sheets:
+        stats["hits"] += 1
+        return sheets[key]
+
+    stats["misses"] += 1
+
+    #imported here since animated_facing_sprite imports this module
+    from animated_facing_sprite import split_sheet
+    sheet = split_sheet(load_image(filename), height, width, single_row)
+    sheets[key] = sheet
+    return sheet
+
+
+def use_bundle(path):
+    """Loads the sprite bundle at path (see bundle.py) the first time
+    an asset is not already cached
+    """
+
+    pending["bundle"] = path
+
+
+def load_pending_bundle():
+    path = pending["bundle"]
+    if path is None:
+        return
+
+    pending["bundle"] = None
+
+    #imported here since bundle imports this module
+    import bundle
+    bundle.load(path)
+
+
+def evict(filename=None):
+    """Drops cached assets loaded from filename, or everything if filename is None.
+    Objects already handed out stay valid; they are just no longer shared.
+    """
+
+    if filename is None:
+        images.clear()
+        masks.clear()
+        sheets.clear()
+        return
+
+    images.pop(filename, None)
+    masks.pop(filename, None)
+    for key in [k for k in sheets if k[0] == filename]:
+        del sheets[key]
+
+
+def get_stats():
+    """Returns a dictionary of hit/miss counts and the number of cached assets"""
+
+    return {"hits": stats["hits"], "misses": stats["misses"],
+            "images": len(images), "masks": len(masks), "sheets": len(sheets)}
+
+
+def reset_stats():
+    stats["hits"] = 0
+    stats["misses"] = 0
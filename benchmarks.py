@@ -0,0 +1,450 @@
+"""
+
+benchmarks.py
+
+Microbenchmarks for individual pieces of the game, run without a display.
+
+usage: python benchmarks.py [name ...]
+(runs every benchmark when no names are given)
+
+"""
+
+import sys
+from timeit import default_timer
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+from pygame import Surface
+from pygame.rect import Rect
+from pygame.mask import Mask
+
+import options as opt
+import headless
+
+
+def time_per_frame(step, frames):
+    """Returns the mean time in milliseconds of calling step() once per frame"""
+
+    start = default_timer()
+    for frame in range(frames):
+        step()
+
+    return 1000 * (default_timer() - start) / frames
+
+
+def bytes_per_frame(step, frames):
+    """Returns the mean peak Python memory in bytes allocated inside one step() call.
+    Pixel data allocated by SDL is not seen by tracemalloc, so this is a lower bound.
+
+    Returns None if tracemalloc is unavailable.
+    """
+
+    if tracemalloc is None:
+        return None
+
+    total = 0
+    tracemalloc.start()
+    for frame in range(frames):
+        tracemalloc.reset_peak()
+        current = tracemalloc.get_traced_memory()[0]
+        step()
+        total += tracemalloc.get_traced_memory()[1] - current
+    tracemalloc.stop()
+
+    return total / float(frames)
+
+
+def objects_per_frame(step, frames, getters, warmup=0):
+    """Returns the mean number of new objects per step() call, where the objects
+    are whatever the getters return (e.g. a sprite's image and mask).
+    Objects first seen during the warmup calls are not counted.
+    """
+
+    seen = set(id(get()) for get in getters)
+    kept = []
+    new = 0
+    for frame in range(warmup + frames):
+        step()
+        for get in getters:
+            obj = get()
+            if id(obj) not in seen:
+                seen.add(id(obj))
+                #keep a reference so ids are not reused
+                kept.append(obj)
+                if frame >= warmup:
+                    new += 1
+
+    return new / float(frames)
+
+
+def print_result(name, ms, allocated=None, objects=None):
+    line = "{0:<32} {1:8.4f}ms/frame".format(name, ms)
+    if allocated is not None:
+        line += " {0:10.1f}B/frame".format(allocated)
+    if objects is not None:
+        line += " {0:6.2f} new objects/frame".format(objects)
+    print(line)
+
+
+
+def copy_shrink(field):
+    """The original ShrinkingIonField.shrink(), which copies the image into
+    a new Surface and builds a new Mask every frame. Kept for comparison.
+    """
+
+    field.height = max(field.height - field.shrink_rate, 0)
+
+    temp_image = Surface((field.width, field.height))
+    temp_image.blit(field.image, Rect(0, 0, 0, 0), Rect(0, field.crop_top, field.width, field.height))
+    field.image = temp_image
+
+    field.mask = Mask((field.width, field.height))
+    field.mask.fill()
+
+    field.top = field.top + field.crop_top
+    field.rect = Rect(field.left, field.top, field.width, field.height)
+
+
+def bench_shrink():
+    """ShrinkingIonField.shrink() over one win animation, before and after"""
+
+    from shrinking_ion_field import ShrinkingIonField
+
+    frames = opt.win_animation_total_runtime
+
+    for name, shrink in (("shrink (copying)", copy_shrink),
+                         ("shrink (in place)", ShrinkingIonField.shrink)):
+        fields = [ShrinkingIonField(*opt.exp_field_args) for i in range(3)]
+        field = fields[0]
+        ms = time_per_frame(lambda: shrink(field), frames)
+        field = fields[1]
+        allocated = bytes_per_frame(lambda: shrink(field), frames)
+        field = fields[2]
+        objects = objects_per_frame(lambda: shrink(field), frames,
+                                    (lambda: field.image, lambda: field.mask))
+        print_result(name, ms, allocated, objects)
+
+
+def bench_transitions():
+    """State machine transitions of the cannon and the enemy base"""
+
+    from ship import Ship
+    from cannon import Cannon
+    from enemy_base import EnemyBase
+
+    player = Ship(*opt.player_args)
+    cannon = Cannon(opt.deactivated_cannon_args, opt.standby_cannon_args,
+                    opt.firing_cannon_args, player)
+    enemy = EnemyBase(opt.mover_args, opt.spinner_args, opt.shooter_args, player)
+
+    cannon_cycle = [cannon.start_standby, lambda: cannon.start_firing((100, 100)),
+                    lambda: cannon.start_returning((200, 100)), cannon.start_deactivated]
+    enemy_cycle = [lambda: enemy.start_spinner((700, 300)),
+                   lambda: enemy.start_shooter((700, 300), (-1, 0)), enemy.resume_mover_state]
+
+    for name, manager, cycle in (("cannon transition", cannon, cannon_cycle),
+                                 ("enemy base transition", enemy, enemy_cycle)):
+        position = [0]
+        def step():
+            cycle[position[0] % len(cycle)]()
+            position[0] += 1
+
+        frames = 1000 * len(cycle)
+        ms = time_per_frame(step, frames)
+        allocated = bytes_per_frame(step, frames)
+        #counts new states and new images/masks of their sprites
+        objects = objects_per_frame(step, frames, (manager.get_state,
+                                    lambda: manager.image, lambda: manager.mask), len(cycle))
+        print_result(name, ms, allocated, objects)
+
+
+def bench_startup():
+    """Cold start to the Title screen and to the first Level, loading sprites
+    from the individual image files and from the bundle
+    """
+
+    import assets
+    import bundle
+    from yarsmanager import YarsManager
+    from level import Level
+
+    def startup(use_bundle):
+        assets.evict()
+        start = default_timer()
+        if use_bundle:
+            assets.use_bundle(opt.bundle_filename)
+        manager = YarsManager()
+        title = default_timer()
+        Level(manager)
+        return title - start, default_timer() - start
+
+    if not bundle.is_current(opt.bundle_filename):
+        bundle.build(opt.bundle_filename)
+
+    runs = 50
+    for name, use_bundle in (("startup (image files)", False), ("startup (bundle)", True)):
+        times = [startup(use_bundle) for i in range(runs)]
+        title = 1000 * sum(t[0] for t in times) / runs
+        level = 1000 * sum(t[1] for t in times) / runs
+        print("{0:<32} {1:8.4f}ms to Title {2:8.4f}ms to first Level".format(name, title, level))
+
+
+def bench_level_transition():
+    """YarsManager.next_level() and game_over(), rebuilding states and reusing them"""
+
+    from yarsmanager import YarsManager
+
+    for name, reuse in (("level transition (rebuild)", False),
+                        ("level transition (reuse)", True)):
+        opt.reuse_states = reuse
+        manager = YarsManager()
+        manager.new_game()
+
+        def step():
+            manager.level.shield.remove(*manager.level.shield.sprites()[:10])
+            manager.next_level()
+            manager.game_over()
+
+        print_result(name, time_per_frame(step, 200))
+
+    opt.reuse_states = True
+
+
+def bench_shield_update():
+    """Per-frame update of a full shield, one sprite per cell vs. the grid"""
+
+    from ship import Ship
+    from enemy_base import EnemyBase
+    from enemy_shield import EnemyShield
+    from grid_shield import GridShield
+    from formations import formation, formation_center
+
+    player = Ship(*opt.player_args)
+    enemy = EnemyBase(opt.mover_args, opt.spinner_args, opt.shooter_args, player)
+
+    for name, model in (("shield update (sprites)", EnemyShield),
+                        ("shield update (grid)", GridShield)):
+        shield = model(enemy, opt.shield_filename, formation, formation_center)
+        print_result(name, time_per_frame(shield.update, 2000),
+                     bytes_per_frame(shield.update, 2000))
+
+
+def bench_shield_collide():
+    """Player vs. a full shield: spritecollide over every cell vs. the grid query"""
+
+    from pygame.sprite import spritecollide, collide_mask
+    from ship import Ship
+    from enemy_base import EnemyBase
+    from grid_shield import GridShield
+    from formations import formation, formation_center
+
+    player = Ship(*opt.player_args)
+    enemy = EnemyBase(opt.mover_args, opt.spinner_args, opt.shooter_args, player)
+    shield = GridShield(enemy, opt.shield_filename, formation, formation_center)
+    player.rect.midright = shield.sprites()[0].rect.midleft
+
+    print_result("shield collide (spritecollide)",
+                 time_per_frame(lambda: spritecollide(player, shield, False, collide_mask), 2000))
+    print_result("shield collide (grid)", time_per_frame(lambda: shield.collide(player), 2000))
+
+    from overlap_tables import OverlapTables
+    shield.overlap_tables = OverlapTables(opt.overlap_table_bytes)
+    shield.overlap_tables.add(player.mask, shield.mask)
+    print_result("shield collide (grid + tables)", time_per_frame(lambda: shield.collide(player), 2000))
+
+
+def bench_shield_draw():
+    """Drawing a full shield, one blit per cell vs. the pre-composited surface"""
+
+    from ship import Ship
+    from enemy_base import EnemyBase
+    from enemy_shield import EnemyShield
+    from grid_shield import GridShield
+    from formations import formation, formation_center
+
+    screen = Surface(opt.window_size)
+    player = Ship(*opt.player_args)
+    enemy = EnemyBase(opt.mover_args, opt.spinner_args, opt.shooter_args, player)
+
+    for name, model in (("shield draw (sprites)", EnemyShield),
+                        ("shield draw (composite)", GridShield)):
+        shield = model(enemy, opt.shield_filename, formation, formation_center)
+        shield.reset_counters()
+        frames = 2000
+        ms = time_per_frame(lambda: shield.draw(screen), frames)
+        print_result(name, ms)
+        print("    {0:.1f} draw calls/frame, {1:.1f} blits/frame".format(
+            shield.draw_calls / float(frames), shield.blit_count / float(frames)))
+
+
+def bench_ion_field_collide():
+    """Player vs. the ion field (whose mask is completely filled) with the player
+    inside, outside and straddling the field's edge, and the deactivated cannon's
+    strip vs. the field; collide_mask vs. an unmemoized CollisionContext query
+    """
+
+    from pygame.sprite import Sprite, collide_mask
+    from ship import Ship
+    from ion_field import IonField
+    from spatial_hash import SpatialHash
+    from collision_context import CollisionContext
+
+    player = Ship(*opt.player_args)
+    ion_field = IonField(*opt.ion_field_args)
+    field = Rect(ion_field.rect.topleft, ion_field.mask.get_size())
+
+    strip = Sprite()
+    strip.rect = Rect(field.left + 10, 0, 1, opt.height)
+    strip.mask = Mask(strip.rect.size)
+    strip.mask.fill()
+
+    #stands in for the shield, which these queries never touch
+    nothing = Sprite()
+    nothing.get_bounds = lambda: Rect(0, 0, 0, 0)
+    context = CollisionContext(SpatialHash(opt.broad_phase_cell_size), nothing)
+
+    def query(left):
+        context.results.clear()
+        return context.collide(left, ion_field)
+
+    cases = (("player inside", player, field.center),
+             ("player outside", player, (field.left - 100, field.centery)),
+             ("player on edge", player, (field.left, field.centery)),
+             ("strip", strip, strip.rect.center))
+
+    for name, left, center in cases:
+        left.rect.center = center
+        context.begin_frame([left, ion_field])
+        print_result(name + " (collide_mask)", time_per_frame(lambda: collide_mask(left, ion_field), 20000))
+        print_result(name + " (context)", time_per_frame(lambda: query(left), 20000))
+
+
+def bench_overlap_tables():
+    """Building a Level's overlap tables, and player vs. homing bullet
+    with collide_mask vs. a table lookup
+    """
+
+    from pygame.sprite import collide_mask
+    from yarsmanager import YarsManager
+    from level import Level
+
+    level = Level(YarsManager())
+    start = default_timer()
+    tables = level.build_overlap_tables()
+    build = 1000 * (default_timer() - start)
+
+    count, size = tables.memory()
+    print("{0:<32} {1:8.4f}ms for {2} tables using {3:.1f}KB ({4} over the limit)".format(
+        "overlap tables build", build, count, size / 1024.0, tables.skipped))
+
+    player = level.player
+    hbullet = level.hbullet
+    hbullet.rect.topleft = (player.rect.left + 10, player.rect.top + 10)
+
+    print_result("player vs hbullet (collide_mask)", time_per_frame(lambda: collide_mask(player, hbullet), 20000))
+    print_result("player vs hbullet (table)", time_per_frame(lambda: tables.collide(player, hbullet), 20000))
+
+
+def bench_swept_collide():
+    """Bullets fired east at a shield worn down to one cell per row, at
+    increasing speeds: how many get through without hitting a cell, with
+    discrete and swept tests
+    """
+
+    from yarsmanager import YarsManager
+    from level import Level
+    from ship import Bullet
+    import vector
+
+    level = Level(YarsManager())
+    context = level.context
+    bounds = level.shield.get_bounds()
+
+    #keep only the leftmost cell of each row
+    rows = set()
+    for cell in level.shield.sprites():
+        if cell.row in rows:
+            cell.kill()
+        rows.add(cell.row)
+
+    for speed in (8, 16, 32, 64):
+        for sweep in (False, True):
+            context.sweep_enabled = sweep
+            passed = 0
+            start = default_timer()
+            for y in range(bounds.top, bounds.bottom, 3):
+                bullet = Bullet(opt.bullet_filename, speed, (bounds.left - speed, y), vector.EAST)
+                while bullet.rect.left <= bounds.right:
+                    bullet.rect.move_ip(speed, 0)
+                    context.begin_frame([bullet], {bullet: (speed, 0)})
+                    if context.collide_shield(bullet):
+                        break
+                else:
+                    passed += 1
+            ms = 1000 * (default_timer() - start)
+            print("{0:<32} {1:8.4f}ms, {2} of {3} bullets got through".format(
+                "speed {0} ({1})".format(speed, "swept" if sweep else "discrete"), ms,
+                passed, len(range(bounds.top, bounds.bottom, 3))))
+
+
+def bench_level_draw():
+    """Drawing a fresh Level with a blit per drawable vs. through the render queue"""
+
+    from yarsmanager import YarsManager
+    from level import Level, LAYERS
+    from render_queue import RenderQueue
+
+    screen = Surface(opt.window_size)
+    level = Level(YarsManager())
+    queue = RenderQueue((0, 0, opt.width, opt.height), LAYERS)
+
+    level.render_queue = None
+    print_result("level draw (blits)", time_per_frame(lambda: level.draw(screen), 2000))
+
+    level.render_queue = queue
+    queue.reset_counters()
+    frames = 2000
+    print_result("level draw (render queue)", time_per_frame(lambda: level.draw(screen), frames))
+    print("    {0:.1f} draw calls/frame, {1:.1f} blits/frame, {2:.1f} culled/frame".format(
+        queue.draw_calls / float(frames), queue.blit_count / float(frames), queue.culled / float(frames)))
+
+
+def bench_hud():
+    """The performance overlay's own cost per frame: recording times and drawing"""
+
+    from pygame.font import Font, get_default_font
+    from perf_hud import PerfHUD
+
+    screen = Surface(opt.window_size)
+    hud = PerfHUD(Font(get_default_font(), opt.font_size), opt.hud_frames, opt.hud_refresh,
+                  1.0 / opt.max_framerate, True)
+
+    def step():
+        hud.record(0.0001, 0.0005, 0.0002, 0.0003, 0.0001)
+        hud.draw(screen)
+
+    print_result("hud record + draw", time_per_frame(step, 2000))
+    print_result("hud panel redraw", time_per_frame(hud.draw_panel, 200))
+
+
+BENCHMARKS = {"level_transition": bench_level_transition, "shrink": bench_shrink, "startup": bench_startup,
+              "transitions": bench_transitions, "shield_update": bench_shield_update,
+              "shield_collide": bench_shield_collide, "shield_draw": bench_shield_draw,
+              "ion_field_collide": bench_ion_field_collide, "overlap_tables": bench_overlap_tables,
+              "swept_collide": bench_swept_collide, "level_draw": bench_level_draw,
+              "hud": bench_hud}
+
+
+def main(argv=None):
+    names = sys.argv[1:] if argv is None else argv
+
+    headless.init_display()
+    for name in names or sorted(BENCHMARKS):
+        BENCHMARKS[name]()
+
+
+if __name__ == '__main__':
+    main()
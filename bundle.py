@@ -0,0 +1,257 @@
+"""
+
+bundle.py
+
+Packs the sprites used by the game into a single bundle file containing one
+atlas image and precomputed masks, and loads that bundle into the asset cache.
+
+Bundle layout:
+    magic (8 bytes), header length (uint32, little endian), JSON header,
+    atlas pixels (RGBA, one row after another),
+    atlas mask plane (one byte per pixel, 1 where the mask is set)
+
+The header lists each file's rect in the atlas, its modification time and
+size when the bundle was built and, for sprite sheets, the frame height and
+width. A bundle whose files no longer match (an edited image, or a filename or
+frame size changed in options.py) is not used; run this script again.
+
+usage: python bundle.py
+(writes options.bundle_filename)
+
+"""
+
+import os
+import json
+import mmap
+import struct
+
+import pygame
+from pygame import Surface, mask
+from pygame.rect import Rect
+
+import assets
+import options as opt
+
+MAGIC = b"YARSBNDL"
+HEADER_FORMAT = "<8sI"
+
+#atlas width in pixels; must fit the widest sprite
+ATLAS_WIDTH = 240
+
+
+def bundle_sprites():
+    """Returns a list of (filename, frame_height, frame_width) for every sprite
+    referenced from options.py; frame sizes are None for single images
+    """
+
+    return [(opt.player_filename, opt.player_height, opt.player_width),
+            (opt.mover_filename, None, None),
+            (opt.spinner_filename, opt.spinner_height, opt.spinner_width),
+            (opt.shooter_filename, opt.shooter_height, opt.shooter_width),
+            (opt.shield_filename, None, None),
+            (opt.homer_filename, None, None),
+            (opt.bullet_filename, None, None),
+            (opt.standby_cannon_filename, None, None),
+            (opt.firing_cannon_filename, None, None)]
+
+
+def source_entries():
+    """Returns a header entry, without the rect, for each distinct bundle
+    sprite as its file is now
+    """
+
+    entries = []
+    for filename, height, width in bundle_sprites():
+        if filename in [e["file"] for e in entries]:
+            continue
+
+        stat = os.stat(filename)
+        entries.append({"file": filename,
+                        "frame": [height, width] if height is not None else None,
+                        "source": [stat.st_mtime, stat.st_size]})
+
+    return entries
+
+
+def pack(sizes, atlas_width):
+    """Shelf-packs rectangles of the given (width, height) sizes
+    returns a list of Rects in the same order and the total atlas height
+    """
+
+    order = sorted(range(len(sizes)), key=lambda i: -sizes[i][1])
+    rects = [None] * len(sizes)
+
+    x = y = shelf_height = 0
+    for i in order:
+        width, height = sizes[i]
+        if x + width > atlas_width:
+            x = 0
+            y += shelf_height
+            shelf_height = 0
+        rects[i] = Rect(x, y, width, height)
+        x += width
+        shelf_height = max(shelf_height, height)
+
+    return rects, y + shelf_height
+
+
+def build(path):
+    """Packs every bundle sprite into an atlas and writes the bundle to path"""
+
+    entries = source_entries()
+    images = []
+    for entry in entries:
+        #round trip through RGBA so opaque images get a solid alpha channel
+        loaded = pygame.image.load(entry["file"])
+        rgba = pygame.image.frombuffer(pygame.image.tostring(loaded, "RGBA"),
+                                       loaded.get_size(), "RGBA")
+        images.append(rgba)
+
+    rects, atlas_height = pack([image.get_size() for image in images], ATLAS_WIDTH)
+
+    atlas = Surface((ATLAS_WIDTH, atlas_height), pygame.SRCALPHA, 32)
+    plane = bytearray(ATLAS_WIDTH * atlas_height)
+    for entry, image, rect in zip(entries, images, rects):
+        entry["rect"] = [rect.x, rect.y, rect.width, rect.height]
+        atlas.blit(image, rect)
+
+        image_mask = mask.from_surface(image)
+        for y in range(rect.height):
+            for x in range(rect.width):
+                if image_mask.get_at((x, y)):
+                    plane[(rect.y + y) * ATLAS_WIDTH + rect.x + x] = 1
+
+    header = json.dumps({"size": [ATLAS_WIDTH, atlas_height],
+                         "entries": entries}).encode("utf-8")
+
+    with open(path, "wb") as f:
+        f.write(struct.pack(HEADER_FORMAT, MAGIC, len(header)))
+        f.write(header)
+        f.write(pygame.image.tostring(atlas, "RGBA"))
+        f.write(bytes(plane))
+
+
+def read_header(path):
+    """Returns the JSON header of the bundle at path"""
+
+    with open(path, "rb") as f:
+        magic, header_length = struct.unpack(HEADER_FORMAT, f.read(struct.calcsize(HEADER_FORMAT)))
+        if magic != MAGIC:
+            raise ValueError("{0} is not a sprite bundle".format(path))
+
+        return json.loads(f.read(header_length).decode("utf-8"))
+
+
+def is_current(path):
+    """Returns True if the bundle at path was built from the sprite files
+    as they are now
+    """
+
+    try:
+        header = read_header(path)
+        expected = source_entries()
+    except (OSError, IOError, ValueError, struct.error):
+        return False
+
+    built = [dict((key, entry.get(key)) for key in ("file", "frame", "source"))
+             for entry in header["entries"]]
+    return built == expected
+
+
+def load(path):
+    """Reads the bundle at path through a memory map and fills the asset cache
+    with subsurfaces of the atlas and masks built from the mask plane.
+
+    The display mode must be set already.
+    """
+
+    with open(path, "rb") as f:
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    view = memoryview(data)
+    try:
+        magic, header_length = struct.unpack_from(HEADER_FORMAT, data)
+        if magic != MAGIC:
+            raise ValueError("{0} is not a sprite bundle".format(path))
+
+        start = struct.calcsize(HEADER_FORMAT)
+        header = json.loads(view[start:start + header_length].tobytes().decode("utf-8"))
+        start += header_length
+
+        size = width, height = tuple(header["size"])
+        pixels_end = start + width * height * 4
+
+        raw = pygame.image.frombuffer(view[start:pixels_end], size, "RGBA")
+        atlas = raw.convert_alpha()
+
+        #mask plane is used as an 8-bit image keyed on 0, so one from_surface
+        #call turns the whole plane into the atlas mask
+        plane = pygame.image.frombuffer(view[pixels_end:pixels_end + width * height], size, "P")
+        plane.set_colorkey(0)
+        atlas_mask = mask.from_surface(plane)
+
+        del raw, plane
+    finally:
+        view.release()
+        data.close()
+
+    for entry in header["entries"]:
+        add_entry(atlas, atlas_mask, entry)
+
+    return atlas
+
+
+def add_entry(atlas, atlas_mask, entry):
+    """Puts one bundle entry into the asset cache"""
+
+    filename = entry["file"]
+    rect = Rect(entry["rect"])
+
+    assets.images[filename] = atlas.subsurface(rect)
+    assets.masks[filename] = sub_mask(atlas_mask, rect)
+
+    if entry["frame"] is None:
+        return
+
+    height, width = entry["frame"]
+    images = []
+    masks = []
+    for row in range(rect.height // height):
+        images.append([])
+        masks.append([])
+        for col in range(rect.width // width):
+            frame = Rect(rect.x + col * width, rect.y + row * height, width, height)
+            images[-1].append(atlas.subsurface(frame))
+            masks[-1].append(sub_mask(atlas_mask, frame))
+
+    assets.sheets[(filename, height, width, False)] = (images, masks)
+
+
+def sub_mask(atlas_mask, rect):
+    """Returns a new Mask of the part of atlas_mask inside rect"""
+
+    result = mask.Mask(rect.size)
+    result.draw(atlas_mask, (-rect.x, -rect.y))
+    return result
+
+
+def preload():
+    """Has the asset cache load the bundle when the first sprite is needed,
+    if bundles are enabled and the bundle file exists and is up to date;
+    returns True if so
+    """
+
+    if not opt.use_bundle or not os.path.exists(opt.bundle_filename):
+        return False
+
+    if not is_current(opt.bundle_filename):
+        print(opt.bundle_filename + " is out of date, loading the image files instead")
+        return False
+
+    assets.use_bundle(opt.bundle_filename)
+    return True
+
+
+if __name__ == '__main__':
+    build(opt.bundle_filename)
+    print("wrote " + opt.bundle_filename)
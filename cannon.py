@@ -39,6 +39,8 @@ class Cannon(Manager):
     def __init__(self, deactivated_args, standby_args, firing_args, target):
         """*_args are tuples of arguments; see corresponding classes' __init__()
         target is the player's sprite (the sprite to follow on standby)
+
+        One state of each kind is built here and reused (see State.reset)
         """
         
         Manager.__init__(self)
@@ -48,6 +50,11 @@ class Cannon(Manager):
         self.firing_args = firing_args
         
         self.target = target
+
+        self.deactivated_state = DeactivatedCannon(self, *self.deactivated_args)
+        self.standby_state = StandbyCannon(self, self.target, *self.standby_args)
+        self.firing_state = FiringCannon(self, (0, 0), *self.firing_args)
+        self.returning_state = ReturningCannon(self, (0, 0), *self.firing_args)
         
         self.start_deactivated()
 
@@ -55,23 +62,23 @@ class Cannon(Manager):
         
         
     def start_deactivated(self):
-        deactive = DeactivatedCannon(self, *self.deactivated_args)
-        self.change_state(deactive)
+        self.deactivated_state.reset()
+        self.change_state(self.deactivated_state)
 
         
     def start_standby(self):
-        standby = StandbyCannon(self, self.target, *self.standby_args)
-        self.change_state(standby)
+        self.standby_state.reset()
+        self.change_state(self.standby_state)
 
         
     def start_firing(self, position):
-        firing = FiringCannon(self, position, *self.firing_args)
-        self.change_state(firing)
+        self.firing_state.reset(position)
+        self.change_state(self.firing_state)
 
 
     def start_returning(self, position):
-        returning = ReturningCannon(self, position, *self.firing_args)
-        self.change_state(returning)
+        self.returning_state.reset(position)
+        self.change_state(self.returning_state)
 
         
         
@@ -120,6 +127,14 @@ class StandbyCannon(State):
         self.STATE_NUMBER = manager.STANDBY
         
         
+    def reset(self):
+        """Puts the sprite back where a new one starts, at (0, 0); it only
+        follows the target from its first update
+        """
+
+        self.sprite.rect.topleft = (0, 0)
+
+
     def update(self):
         """keep left, follow the target's vertical position"""
         
@@ -153,12 +168,19 @@ class FiringCannon(State):
         State.__init__(self, manager)
 
         self.sprite = ASprite(sprite_filename, speed)
-        self.sprite.rect.center = position
         self.direction = vector.EAST
         
         self.STATE_NUMBER = manager.FIRING
+
+        self.reset(position)
         
         
+    def reset(self, position):
+        """position is the sprite's new rect.center coordinate"""
+
+        self.sprite.rect.center = position
+
+
     def update(self):
         """move in the direction"""
         
@@ -0,0 +1,247 @@
+"""
+
+collision_context.py
+
+Contains the CollisionContext class, which answers the collision queries of one
+frame and remembers the answers.
+
+Mask tests, shield queries and state numbers are computed once and reused
+until the sprites involved are invalidated (because they moved, changed state,
+or lost shield cells) or the next frame begins.
+
+Sprites that moved in a straight line this step can be swept: when a pair
+moved far enough relative to each other that they could have passed through
+each other, the test is repeated at points along the way, spaced closely
+enough that their rects can't skip over each other.
+
+"""
+
+from pygame.sprite import collide_mask
+
+from spatial_hash import footprint
+
+
+class CollisionContext():
+    """Memoizes collision queries on top of a SpatialHash broad phase.
+
+    shield is the object whose collide(sprite) gives the cells sprite hits;
+    its entry in the broad phase is its get_bounds().
+
+    If overlap_tables (an overlap_tables.OverlapTables) is given, mask tests
+    go through it.
+
+    If sweep is True, queries between sprites that moved are swept.
+    cell_size is the (width, height) of one shield cell, which is what a
+    sprite would have to pass through to get past the shield.
+
+    Keeps counters for profiling: hits is the number of queries answered from
+    memory, misses the number that had to be computed. sweeps is the number
+    of swept tests, swept_hits the number of them that found a collision
+    before the end of the step.
+    """
+
+    def __init__(self, broad_phase, shield, overlap_tables=None, sweep=False, cell_size=(1, 1)):
+        self.broad_phase = broad_phase
+        self.shield = shield
+        self.overlap_tables = overlap_tables
+        self.sweep_enabled = sweep
+        self.cell_size = cell_size
+
+        #dictionary from sprite to the (dx, dy) it moved in a straight line this step
+        self.motion = {}
+
+        #dictionary from (left, right) to the result of the query
+        self.results = {}
+        #dictionary from sprite to its state number
+        self.states = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.sweeps = 0
+        self.swept_hits = 0
+
+
+    def begin_frame(self, sprites, motion=None):
+        """Forgets every result and puts sprites and the shield into the broad phase
+        at their current positions.
+
+        motion is a dictionary from sprite (or the shield) to the (dx, dy) it moved
+        in a straight line this step; those are put in the broad phase with the
+        whole area they swept.
+        """
+
+        self.results.clear()
+        self.states.clear()
+        self.motion = motion or {}
+
+        broad_phase = self.broad_phase
+        broad_phase.clear()
+
+        for sprite in sprites:
+            broad_phase.insert(sprite, self.get_swept_rect(sprite, footprint(sprite)))
+
+        shield = self.shield
+        broad_phase.insert(shield, self.get_swept_rect(shield, shield.get_bounds()))
+
+
+    def get_swept_rect(self, sprite, rect):
+        """Returns rect grown to cover where it was at the start of the step"""
+
+        if sprite not in self.motion:
+            return rect
+
+        dx, dy = self.motion[sprite]
+        return rect.union(rect.move(-dx, -dy))
+
+
+    def get_steps(self, left, right):
+        """Returns (number of points to test, (dx, dy) left moved relative to right)"""
+
+        motion = self.motion
+        if not self.sweep_enabled or (left not in motion and right not in motion):
+            return 1, (0, 0)
+
+        left_dx, left_dy = motion.get(left, (0, 0))
+        right_dx, right_dy = motion.get(right, (0, 0))
+        dx = left_dx - right_dx
+        dy = left_dy - right_dy
+
+        #the rects overlap for a span of left_width + right_width - 1 offsets
+        #along x (and the same along y), so points closer than that can't skip it
+        left_width, left_height = left.mask.get_size()
+        if right is self.shield:
+            right_width, right_height = self.cell_size
+        else:
+            right_width, right_height = right.mask.get_size()
+
+        x_steps = -(-abs(dx) // max(left_width + right_width - 1, 1))
+        y_steps = -(-abs(dy) // max(left_height + right_height - 1, 1))
+        return max(x_steps, y_steps, 1), (dx, dy)
+
+
+    def sweep(self, sprite, steps, relative_motion, test):
+        """Returns the first true result of test() with sprite moved back along
+        relative_motion to each of steps evenly spaced points, ending where it is now.
+        sprite is always left where it was.
+        """
+
+        self.sweeps += 1
+        rect = sprite.rect
+        end_x, end_y = rect.topleft
+        dx, dy = relative_motion
+
+        try:
+            for step in range(1, steps):
+                back = float(steps - step) / steps
+                rect.topleft = (end_x - int(round(dx * back)), end_y - int(round(dy * back)))
+                self.broad_phase.mask_tests += 1
+                result = test()
+                if result:
+                    self.swept_hits += 1
+                    return result
+        finally:
+            rect.topleft = (end_x, end_y)
+
+        self.broad_phase.mask_tests += 1
+        return test()
+
+
+    def invalidate(self, sprite):
+        """Forgets every result involving sprite; call after sprite moves,
+        changes state or (for the shield) loses cells
+        """
+
+        self.states.pop(sprite, None)
+        for key in [key for key in self.results if sprite in key]:
+            del self.results[key]
+
+        if sprite is self.shield:
+            self.broad_phase.insert(sprite, sprite.get_bounds())
+        elif sprite in self.broad_phase.items:
+            self.broad_phase.insert(sprite, footprint(sprite))
+
+
+    def get_candidates(self, sprite):
+        """Returns a list of the sprites (and possibly the shield) that pass the
+        broad phase against sprite, found from the buckets sprite touches
+        """
+
+        return self.broad_phase.query_item(sprite)
+
+
+    def collide(self, left, right):
+        """collide_mask, but only for pairs that pass the broad phase.
+
+        Masks that are completely filled (like the ion field's) still go
+        through collide_mask: the overlap stops at the first set bit it finds,
+        so it is already cheaper than any test done in Python (see benchmarks.py
+        ion_field_collide).
+        """
+
+        key = (left, right)
+        if key in self.results:
+            self.hits += 1
+            return self.results[key]
+
+        self.misses += 1
+        broad_phase = self.broad_phase
+        steps, relative_motion = self.get_steps(left, right)
+        if not broad_phase.may_collide(left, right):
+            result = False
+        elif steps == 1:
+            broad_phase.mask_tests += 1
+            result = self.test_masks(left, right)
+        else:
+            result = self.sweep(left, steps, relative_motion, lambda: self.test_masks(left, right))
+
+        self.results[key] = result
+        return result
+
+
+    def test_masks(self, left, right):
+        if self.overlap_tables is not None:
+            return self.overlap_tables.collide(left, right)
+
+        return collide_mask(left, right)
+
+
+    def collide_shield(self, sprite):
+        """Returns the shield cells sprite collides with, checking the broad phase first"""
+
+        key = (sprite, self.shield)
+        if key in self.results:
+            self.hits += 1
+            return self.results[key]
+
+        self.misses += 1
+        broad_phase = self.broad_phase
+        steps, relative_motion = self.get_steps(sprite, self.shield)
+        if not broad_phase.may_collide(sprite, self.shield):
+            result = []
+        elif steps == 1:
+            broad_phase.mask_tests += 1
+            result = self.shield.collide(sprite)
+        else:
+            result = self.sweep(sprite, steps, relative_motion, lambda: self.shield.collide(sprite))
+
+        self.results[key] = result
+        return result
+
+
+    def get_state_number(self, sprite):
+        """sprite.get_state_number(), remembered until sprite is invalidated"""
+
+        if sprite in self.states:
+            self.hits += 1
+            return self.states[sprite]
+
+        self.misses += 1
+        state_number = self.states[sprite] = sprite.get_state_number()
+        return state_number
+
+
+    def reset_counters(self):
+        self.hits = 0
+        self.misses = 0
+        self.sweeps = 0
+        self.swept_hits = 0
@@ -0,0 +1,100 @@
+"""
+
+collision_matrix.py
+
+Contains the CollisionMatrix class, a declarative table of which entities can
+collide in which states and what happens when they do.
+
+Entities are identified by a kind (e.g. "player", "cannon") and the state
+number of their state machine (see statemachine.Manager.get_state_number).
+A pair of (kind, state) entries with no rule is dead: it can't have any effect,
+so it is skipped before any geometry is done.
+
+"""
+
+#matches every state of an entity, including entities without states
+ANY = None
+
+
+class CollisionMatrix():
+    """Ordered table of collision rules.
+
+    Kind pairs are checked in the order their first rule was added.
+    state_names is an optional dictionary from kind to a dictionary from
+    state number to name, used by describe().
+
+    Keeps counters for profiling: live_pairs and dead_pairs are for callers
+    to count the entity pairs they tested and skipped.
+    """
+
+    def __init__(self, state_names=None):
+        self.state_names = state_names or {}
+
+        #list of (left_kind, right_kind) in checking order
+        self.pairs = []
+        #dictionary from (left_kind, right_kind) to
+        #dictionary from (left_state, right_state) to handler name
+        self.rules = {}
+
+        self.live_pairs = 0
+        self.dead_pairs = 0
+
+
+    def add(self, left_kind, left_state, right_kind, right_state, handler):
+        """handler is the name of the method called when the pair collides
+        in these states; use ANY to match every state
+        """
+
+        pair = (left_kind, right_kind)
+        if pair not in self.rules:
+            self.pairs.append(pair)
+            self.rules[pair] = {}
+
+        self.rules[pair][(left_state, right_state)] = handler
+
+
+    def get_handler(self, left_kind, left_state, right_kind, right_state):
+        """Returns the handler name for the pair in these states,
+        or None if the pair is dead. Exact states win over ANY.
+        """
+
+        rules = self.rules.get((left_kind, right_kind))
+        if rules is None:
+            return None
+
+        for key in ((left_state, right_state), (left_state, ANY),
+                    (ANY, right_state), (ANY, ANY)):
+            if key in rules:
+                return rules[key]
+
+        return None
+
+
+    def is_live(self, left_kind, left_state, right_kind, right_state):
+        return self.get_handler(left_kind, left_state, right_kind, right_state) is not None
+
+
+    def describe(self):
+        """Returns a list of lines, one per rule, for debugging"""
+
+        lines = []
+        for left_kind, right_kind in self.pairs:
+            for (left_state, right_state), handler in self.rules[(left_kind, right_kind)].items():
+                lines.append("{0} x {1} -> {2}".format(self.entry_name(left_kind, left_state),
+                                                     self.entry_name(right_kind, right_state),
+                                                     handler))
+
+        return lines
+
+
+    def entry_name(self, kind, state):
+        if state is ANY:
+            return kind
+
+        name = self.state_names.get(kind, {}).get(state, str(state))
+        return "{0}[{1}]".format(kind, name)
+
+
+    def reset_counters(self):
+        self.live_pairs = 0
+        self.dead_pairs = 0
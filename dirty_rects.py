@@ -0,0 +1,91 @@
+"""
+
+dirty_rects.py
+
+Support for pushing only the changed parts of the screen to the display.
+
+The whole frame is still drawn to the screen surface as usual. Each GameState
+reports the rects it drew that can differ from the last frame (see
+GameState.get_dirty_rects), and only those, plus the rects drawn in the last
+frame, are copied to the display.
+
+"""
+
+import pygame
+from pygame.rect import Rect
+
+
+def image_rect(sprite):
+    """Returns the area screen.blit(sprite.image, sprite.rect) covers"""
+
+    return Rect(sprite.rect.topleft, sprite.image.get_size())
+
+
+def merge_rects(rects):
+    """Returns a list of rects covering rects, where overlapping ones are
+    replaced by their union so no pixel is pushed twice
+    """
+
+    merged = []
+    for rect in rects:
+        index = rect.collidelist(merged)
+        while index != -1:
+            rect = rect.union(merged.pop(index))
+            index = rect.collidelist(merged)
+        merged.append(rect)
+
+    return merged
+
+
+class DirtyRects():
+    """Updates the display from the rects drawn this frame and last frame.
+
+    Keeps counters for profiling: frames, full_updates and pixels, the total
+    area pushed to the display.
+    """
+
+    def __init__(self, screen_rect):
+        self.screen_rect = Rect(screen_rect)
+
+        #rects drawn last frame; the display still shows them there
+        self.previous = []
+
+        self.frames = 0
+        self.full_updates = 0
+        self.pixels = 0
+
+
+    def update(self, rects, full=False):
+        """Pushes rects and the last frame's rects to the display.
+        The whole display is updated instead if full is True or rects is None
+        (a state that can't tell what it changed).
+        Returns the list of rects pushed.
+        """
+
+        self.frames += 1
+
+        if full or rects is None:
+            self.previous = rects or []
+            self.full_updates += 1
+            self.pixels += self.screen_rect.width * self.screen_rect.height
+            pygame.display.update()
+            return [self.screen_rect]
+
+        screen_rect = self.screen_rect
+        clipped = [rect.clip(screen_rect) for rect in self.previous + rects]
+        region = merge_rects([rect for rect in clipped if rect.width and rect.height])
+        self.previous = rects
+
+        self.pixels += sum(rect.width * rect.height for rect in region)
+        pygame.display.update(region)
+        return region
+
+
+    def get_pixels_per_frame(self):
+        return self.pixels / float(self.frames) if self.frames else 0.0
+
+
+    def reset_counters(self):
+        self.frames = 0
+        self.full_updates = 0
+        self.pixels = 0
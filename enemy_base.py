@@ -38,6 +38,8 @@ class EnemyBase(Manager):
     def __init__(self, mover_args, spinner_args, shooter_args, target):
         """mover_args, spinner_args, and shooter_args are tuples of arguments
         target is the player's sprite (the sprite to fire toward)
+
+        One state of each kind is built here and reused (see State.reset)
         """
 
         Manager.__init__(self)
@@ -49,23 +51,24 @@ class EnemyBase(Manager):
         self.target = target
         
         self.mover_state = MovingBase(self, *self.mover_args)
+        self.spinner_state = SpinningBase(self, (0, 0), self.target, *self.spinner_args)
+        self.shooter_state = ShootingBase(self, (0, 0), vector.SOUTH, *self.shooter_args)
         self.change_state(self.mover_state)
 
 
     def start_mover(self):
-        mover = MovingBase(self, *self.mover_args)
-        self.mover_state = mover
-        self.change_state(mover)
+        self.mover_state.reset()
+        self.change_state(self.mover_state)
 
 
     def start_spinner(self, position):
-        spinner = SpinningBase(self, position, self.target, *self.spinner_args)
-        self.change_state(spinner)
+        self.spinner_state.reset(position)
+        self.change_state(self.spinner_state)
 
 
     def start_shooter(self, position, direction):
-        shooter = ShootingBase(self, position, direction, *self.shooter_args)
-        self.change_state(shooter)
+        self.shooter_state.reset(position, direction)
+        self.change_state(self.shooter_state)
 
 
     def resume_mover_state(self):
@@ -97,18 +100,24 @@ class MovingBase(State):
         
         self.sprite = ASprite(sprite_filename, speed)
 
-        self.sprite.rect.topright = (options.width, top)
-        
         self.top = top
         self.bottom = bottom
-        self.current_dir = vector.SOUTH
 
         self.transition_probability = 1.0 / (avg_transition * options.max_framerate)
         
         self.STATE_NUMBER = manager.MOVING
         self.IS_FOLLOWABLE = True
+
+        self.reset()
         
         
+    def reset(self):
+        """back to the top of the movement range, moving down"""
+
+        self.sprite.rect.topright = (options.width, self.top)
+        self.current_dir = vector.SOUTH
+
+
     def update(self):
         self.sprite.move(self.current_dir)
 
@@ -153,18 +162,26 @@ class SpinningBase(State):
         State.__init__(self, manager)
 
         self.sprite = AnimatedFacingSprite(sprite_sheet, height, width, delay, 0)
-        self.sprite.rect.center = position
 
         self.target = target
         
         self.targ_time = targ_time
         self.shoot_time = shoot_time
-        self.tick = 0
         
         self.STATE_NUMBER = manager.SPINNING
         self.IS_FOLLOWABLE = False
+
+        self.reset(position)
         
         
+    def reset(self, position):
+        """position is the sprite's new rect.center coordinates"""
+
+        self.sprite.reset_animation()
+        self.sprite.rect.center = position
+        self.tick = 0
+
+
     def update(self):
         self.sprite.update()
         
@@ -201,14 +218,23 @@ class ShootingBase(State):
         State.__init__(self, manager)
 
         self.sprite = AnimatedFacingSprite(sprite_sheet, height, width, delay, speed)
-        self.sprite.rect.center = position
-
-        self.direction = direction
         
         self.STATE_NUMBER = manager.SHOOTING
         self.IS_FOLLOWABLE = False
+
+        self.reset(position, direction)
         
         
+    def reset(self, position, direction):
+        """position is the sprite's new rect.center coordinates
+        direction is a vector
+        """
+
+        self.sprite.reset_animation()
+        self.sprite.rect.center = position
+        self.direction = direction
+
+
     def update(self):
         self.sprite.update()
         ASprite.move(self.sprite, self.direction)
@@ -12,7 +12,10 @@ is_followable() which returns True if the target wants to be followed
 """
 
 import pygame
-from pygame.sprite import Sprite, Group
+from pygame.sprite import Sprite, Group, spritecollide, collide_mask
+
+import assets
+import tracer
 
 class EnemyShield(Group):
     """Things an EnemyShield will need:
@@ -30,8 +33,9 @@ class EnemyShield(Group):
         self.sprite_filename = sprite_filename
         self.target_position = target_position
         
-        #this image is passed to each Cell object
-        cell_image = pygame.image.load(sprite_filename).convert_alpha()
+        #this image and mask are shared by every Cell object
+        cell_image = assets.load_image(sprite_filename)
+        cell_mask = assets.load_mask(sprite_filename)
         
         #convert formation list into table of cell sprites
         #offsets are the difference between current cell and target cell
@@ -47,7 +51,7 @@ class EnemyShield(Group):
                     cells_row.append(None)
                 #1 means a cell sprite should be added here
                 elif col == 1:
-                    new_cell = Cell(row_offset, col_offset, cell_image, target)
+                    new_cell = Cell(row_offset, col_offset, cell_image, cell_mask, target)
                     Group.add(self, new_cell)
                     cells_row.append(new_cell)
                 #anything else means wtf are you doing
@@ -57,18 +61,64 @@ class EnemyShield(Group):
             row_offset += 1
             
         self.cells = cells
+
+        #the full formation, kept so the shield can be regrown without new cells
+        self.formation_cells = [list(row) for row in cells]
         
         self.delay = 0
+
+        #counters for profiling drawing, see reset_counters()
+        self.draw_calls = 0
+        self.blit_count = 0
+
+
+    def draw(self, screen):
+        Group.draw(self, screen)
+        self.draw_calls += 1
+        self.blit_count += len(self)
+
+
+    def get_blits(self):
+        """Returns the (surface, position) pairs draw() would blit"""
+
+        return [(cell.image, cell.rect) for cell in self]
+
+
+    def reset_counters(self):
+        self.draw_calls = 0
+        self.blit_count = 0
+
+
+    def regrow(self):
+        """Restores every cell of the original formation and clears marks and delay"""
+
+        #re-add every cell in formation order, so the Group iterates (and
+        #spritecollide returns cells) in the same order as a new shield
+        Group.empty(self)
+
+        cells = []
+        for row in self.formation_cells:
+            cells.append(list(row))
+            for cell in row:
+                if cell is not None:
+                    cell.marked = False
+                    Group.add(self, cell)
+
+        self.cells = cells
+        self.delay = 0
+        Group.update(self)
     
     
     def update(self):
         """Updates cells' positions only if target is followable"""
         
+        start = tracer.begin()
         if self.target.is_followable():
             Group.update(self)
             
         if self.delay > 0:
             self.delay -= 1
+        tracer.end("EnemyShield.update", start)
             
             
     def remove(self, *sprites):
@@ -121,6 +171,22 @@ class EnemyShield(Group):
         self.remove(cell, ne_cell, e_cell, se_cell, ee_cell)
         
         
+    def collide(self, sprite):
+        """Returns a list of the cells whose masks overlap sprite's mask"""
+
+        return spritecollide(sprite, self, False, collide_mask)
+
+
+    def get_bounds(self):
+        """Returns a Rect around all the cells, or an empty Rect if there are none"""
+
+        rects = [cell.rect for cell in self]
+        if len(rects) == 0:
+            return pygame.Rect(0, 0, 0, 0)
+
+        return rects[0].unionall(rects[1:])
+
+
     def get_cell_row_col(self, cell):
         """Returns the (row, col) tuple for the given cell's location in the
         EnemyShield.cells array
@@ -144,12 +210,13 @@ class Cell(Sprite):
     and contains proper function overrides for behavior of being killed
     """
     
-    def __init__(self, row_offset, col_offset, cell_image, target):
+    def __init__(self, row_offset, col_offset, cell_image, cell_mask, target):
         """Set attributes and update to position"""
         
         Sprite.__init__(self)
         
         self.image = cell_image
+        self.mask = cell_mask
         self.row_offset = row_offset
         self.col_offset = col_offset
         self.target = target
@@ -23,6 +23,46 @@ def check_quit(events, keys):
     return True
 
 
+def check_profile_buttons(events, keys, toggle, capture):
+    """Checks for the profiler buttons: F5 starts or stops profiling,
+    F6 profiles a fixed number of frames
+
+    toggle and capture are no-args functions which should be called if
+    their button is pressed"""
+
+    for e in events:
+        if e.type == KEYDOWN and e.key == K_F5:
+            toggle()
+        elif e.type == KEYDOWN and e.key == K_F6:
+            capture()
+
+    return True
+
+
+def check_hud_button(events, keys, action):
+    """Checks for the performance overlay button (F3)
+
+    action is a no-args function which should be called if the button is pressed"""
+
+    for e in events:
+        if e.type == KEYDOWN and e.key == K_F3:
+            action()
+
+    return True
+
+
+def check_trace_button(events, keys, action):
+    """Checks for the trace button (F4)
+
+    action is a no-args function which should be called if the button is pressed"""
+
+    for e in events:
+        if e.type == KEYDOWN and e.key == K_F4:
+            action()
+
+    return True
+
+
 def move_player(events, keys, player):
     """Checks for player movement keys and moves player accordingly"""
     
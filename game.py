@@ -8,6 +8,7 @@ Global initializations and main loop for general game
 
 import sys
 import math
+from timeit import default_timer
 
 import pygame
 from pygame import key
@@ -16,40 +17,106 @@ from pygame.time import Clock
 from pygame.font import Font, get_default_font
 
 import options as opt
+import bundle
 from yarsmanager import YarsManager
+from dirty_rects import DirtyRects
+from perf_hud import PerfHUD
+from profiler import Profiler
+import tracer
+import event_handlers
 
 def main():
     """Main program loop"""
     
     pygame.init()
     screen = pygame.display.set_mode(opt.window_size)
+    bundle.preload()
     
     sys_font = Font(get_default_font(), opt.font_size)
     clock = Clock()
     
     manager = YarsManager()
+    manager.gc_policy.install()
+    display = DirtyRects(screen.get_rect())
+    last_state = None
+
+    last_fps_string = None
+    hud = PerfHUD(sys_font, opt.hud_frames, opt.hud_refresh, 1.0 / opt.max_framerate, opt.hud_visible)
+    if opt.trace:
+        tracer.enable(opt.trace_max_events)
+
+    profiler = Profiler(opt.profile_top, opt.profile_sort)
+    capture_frames = lambda: profiler.capture(opt.profile_frames)
 
     running = True
     
     while running:
         #limit framerate and prepare FPS display text
         clock.tick(opt.max_framerate)
-        fps = clock.get_fps()
-        fps_text = sys_font.render("FPS: {0:.1f}".format(fps), False, opt.white)
+        fps_string = "FPS: {0:.1f}".format(clock.get_fps())
+        if fps_string != last_fps_string:
+            fps_text = sys_font.render(fps_string, False, opt.white)
+            last_fps_string = fps_string
         
+        profiler.begin_frame()
+        start = default_timer()
         if event.get(pygame.QUIT):
             sys.exit()
 
-        running = manager.handle_events(event.get(), key.get_pressed())
+        events = event.get()
+        keys = key.get_pressed()
+        event_handlers.check_profile_buttons(events, keys, profiler.toggle, capture_frames)
+        event_handlers.check_hud_button(events, keys, hud.toggle)
+        if opt.trace:
+            event_handlers.check_trace_button(events, keys, write_trace)
+        running = manager.handle_events(events, keys)
+
+        input_done = default_timer()
+        updated_state = manager.get_state()
         manager.update()
+        collision_time = getattr(updated_state, "collision_time", 0.0)
 
+        update_done = default_timer()
         screen.fill(opt.black)
         manager.draw(screen)
-        screen.blit(fps_text, fps_text.get_rect(top = 0, right = opt.width))
-        pygame.display.update()
+        fps_rect = screen.blit(fps_text, fps_text.get_rect(top = 0, right = opt.width))
+        hud_rect = hud.draw(screen)
+
+        draw_done = default_timer()
+        if opt.dirty_rects:
+            #a new state's first frame replaces everything on screen
+            state = manager.get_state()
+            rects = manager.get_dirty_rects()
+            if rects is not None:
+                rects.append(fps_rect)
+                if hud_rect is not None:
+                    rects.append(hud_rect)
+            display.update(rects, state is not last_state)
+            last_state = state
+        else:
+            pygame.display.update()
+
+        flip_done = default_timer()
+        hud.record(input_done - start, update_done - input_done, collision_time,
+                   draw_done - update_done, flip_done - draw_done)
+
+        tracer.span("frame", start, flip_done)
+        tracer.span("input", start, input_done)
+        tracer.span("update", input_done, update_done)
+        tracer.span("draw", update_done, draw_done)
+        tracer.span("flip", draw_done, flip_done)
+
+        profiler.end_frame(updated_state)
 		
+    if profiler.running:
+        profiler.stop()
+
     sys.exit()
 
 
+def write_trace():
+    print("wrote trace " + tracer.write())
+
+
 if __name__ == '__main__':
     main()
@@ -6,6 +6,8 @@ Contains classes GameManager and GameState for implementing game states
 
 """
 
+import tracer
+
 class GameManager():
     """GameManager is the universal accessor for GameStates.
     It contains methods for updating, event handling, drawing, and transitioning.
@@ -23,7 +25,11 @@ class GameManager():
     def draw(self, screen):
         self.current_state.draw(screen)
 
+    def get_dirty_rects(self):
+        return self.current_state.get_dirty_rects()
+
     def change_state(self, new_state):
+        tracer.transition(self, new_state)
         self.current_state = new_state
 
     def get_state(self):
@@ -49,3 +55,9 @@ class GameState():
     def draw(self, screen):
         """draws all sprites to the screen"""
         raise NotImplementedError
+
+    def get_dirty_rects(self):
+        """returns a list of the rects drawn by the last draw() whose contents
+        may differ from the frame before, or None if the whole screen may have
+        changed (see dirty_rects.py)"""
+        return None
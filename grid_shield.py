@@ -0,0 +1,326 @@
+"""
+grid_shield.py
+
+A GridShield is an alternative to EnemyShield that behaves the same way but
+keeps no per-cell sprites. The formation is stored as flat arrays of
+alive flags and mark times, and each cell's rect is derived from the target's
+position when it is needed. Updating the shield costs the same no matter how
+many cells it has.
+
+Like EnemyShield, GridShield expects the target object to provide:
+get_rect() which returns the target's rectangle
+is_followable() which returns True if the target wants to be followed
+
+The living cells are kept pre-drawn on one surface with one combined mask.
+Only the affected cell is patched when a cell is removed, and drawing the
+shield is a single blit.
+
+GridCell objects stand in for cell sprites wherever code expects them
+(collision functions, kill(), mark(), etc.). There is one per formation slot,
+made at construction; they hold no state besides their location.
+
+"""
+
+import pygame
+from pygame import Surface
+from pygame.rect import Rect
+from pygame.mask import Mask
+
+import assets
+import tracer
+
+#number of shield updates a cell stays marked (same as enemy_shield.Cell)
+MARK_TIME = 10
+
+
+class GridShield():
+    """Things a GridShield will need (same as EnemyShield):
+    -a target to follow; expected to have a get_rect() function
+    -cell sprite filename
+    -a formation
+    -a position (row, col) in the formation corresponding to the UPPER LEFT of the target
+    """
+
+    def __init__(self, target, sprite_filename, formation, target_position):
+
+        self.target = target
+        self.sprite_filename = sprite_filename
+        self.target_position = target_position
+
+        self.image = assets.load_image(sprite_filename)
+        self.mask = assets.load_mask(sprite_filename)
+        self.cell_width, self.cell_height = self.image.get_size()
+
+        self.rows = len(formation)
+        self.cols = len(formation[0])
+
+        #flat arrays indexed by row * cols + col
+        self.formation = bytearray(self.rows * self.cols)
+        self.views = [None] * (self.rows * self.cols)
+        for row in range(self.rows):
+            for col in range(self.cols):
+                #0 means the cell is empty, 1 means a cell
+                if formation[row][col] not in (0, 1):
+                    raise ValueError("formation entries must be 0 or 1")
+                if formation[row][col] == 1:
+                    index = row * self.cols + col
+                    self.formation[index] = 1
+                    self.views[index] = GridCell(self, row, col)
+
+        self.alive = bytearray(self.formation)
+        self.mark_ticks = [None] * (self.rows * self.cols)
+
+        #all living cells drawn together, with the formation's (0, 0) at the top left
+        size = (self.cols * self.cell_width, self.rows * self.cell_height)
+        self.composite = Surface(size, pygame.SRCALPHA, 32)
+        self.composite_mask = Mask(size)
+
+        #optional overlap_tables.OverlapTables used for cell mask tests
+        self.overlap_tables = None
+
+        #counters for profiling drawing, see reset_counters()
+        self.draw_calls = 0
+        self.blit_count = 0
+        self.patch_count = 0
+
+        #counts updates while followed; marks expire relative to this
+        self.tick = 0
+        self.left, self.top = target.get_rect().topleft
+
+        self.delay = 0
+
+        self.composite_cells()
+
+
+    def update(self):
+        """Moves the grid with the target only if target is followable"""
+
+        start = tracer.begin()
+        if self.target.is_followable():
+            self.left, self.top = self.target.get_rect().topleft
+            self.tick += 1
+
+        if self.delay > 0:
+            self.delay -= 1
+        tracer.end("GridShield.update", start)
+
+
+    def draw(self, screen):
+        screen.blit(self.composite, self.get_cell_topleft(0, 0))
+        self.draw_calls += 1
+        self.blit_count += 1
+
+
+    def get_blits(self):
+        """Returns the (surface, position) pairs draw() would blit"""
+
+        return [(self.composite, self.get_cell_topleft(0, 0))]
+
+
+    def composite_cells(self):
+        """Redraws the composite surface and mask from scratch"""
+
+        self.composite.fill((0, 0, 0, 0))
+        self.composite_mask.clear()
+
+        for cell in self.sprites():
+            position = (cell.col * self.cell_width, cell.row * self.cell_height)
+            self.composite.blit(self.image, position)
+            self.composite_mask.draw(self.mask, position)
+            self.patch_count += 1
+
+
+    def erase_cell(self, cell):
+        """Patches one removed cell out of the composite surface and mask"""
+
+        position = (cell.col * self.cell_width, cell.row * self.cell_height)
+        self.composite.fill((0, 0, 0, 0), Rect(position, (self.cell_width, self.cell_height)))
+        self.composite_mask.erase(self.mask, position)
+        self.patch_count += 1
+
+
+    def reset_counters(self):
+        self.draw_calls = 0
+        self.blit_count = 0
+        self.patch_count = 0
+
+
+    def regrow(self):
+        """Restores every cell of the original formation and clears marks and delay"""
+
+        self.alive[:] = self.formation
+        self.mark_ticks = [None] * (self.rows * self.cols)
+        self.left, self.top = self.target.get_rect().topleft
+        self.delay = 0
+
+        self.composite_cells()
+
+
+    def sprites(self):
+        """Returns a list of GridCells for the living cells"""
+
+        alive = self.alive
+        return [cell for cell in self.views if cell is not None and alive[cell.index]]
+
+
+    def __iter__(self):
+        return iter(self.sprites())
+
+
+    def __len__(self):
+        return sum(self.alive)
+
+
+    def __contains__(self, cell):
+        return cell is not None and self.alive[cell.index] == 1
+
+
+    def remove(self, *cells):
+
+        for cell in cells:
+            if cell not in self: continue
+
+            self.alive[cell.index] = 0
+            self.mark_ticks[cell.index] = None
+            self.erase_cell(cell)
+
+
+    def remove_cross(self, cell):
+        """Kills the given cell as well as the cells E, NE, SE, and twice E of it.
+
+        i.e. the given cell is the left arm of a plus sign of cells removed
+        """
+
+        row, col = self.get_cell_row_col(cell)
+
+        self.remove(cell, self.get_cell(row - 1, col + 1), self.get_cell(row, col + 1),
+                    self.get_cell(row + 1, col + 1), self.get_cell(row, col + 2))
+
+
+    def collide(self, sprite):
+        """Returns a list of the living cells whose masks overlap sprite's mask,
+        in formation order. Same result as spritecollide(sprite, shield, False, collide_mask)
+        but only the cells under sprite.rect are mask tested.
+        """
+
+        rect = sprite.rect
+        target_row, target_col = self.target_position
+        width = self.cell_width
+        height = self.cell_height
+
+        #one test against all the cells at once rules out most frames
+        left, top = self.get_cell_topleft(0, 0)
+        if not sprite.mask.overlap(self.composite_mask, (left - rect.left, top - rect.top)):
+            return []
+
+        #range of rows and cols whose cells could overlap rect
+        first_col = max((rect.left - self.left) // width + target_col, 0)
+        last_col = min((rect.right - 1 - self.left) // width + target_col, self.cols - 1)
+        first_row = max((rect.top - self.top) // height + target_row, 0)
+        last_row = min((rect.bottom - 1 - self.top) // height + target_row, self.rows - 1)
+
+        cell_mask = self.mask
+        if self.overlap_tables is not None:
+            overlap = self.overlap_tables.get_overlap(sprite.mask, cell_mask)
+        else:
+            overlap = sprite.mask.overlap
+        alive = self.alive
+        collides = []
+
+        for row in range(first_row, last_row + 1):
+            y_offset = self.top + (row - target_row) * height - rect.top
+            for col in range(first_col, last_col + 1):
+                index = row * self.cols + col
+                if not alive[index]: continue
+
+                x_offset = self.left + (col - target_col) * width - rect.left
+                if overlap(cell_mask, (x_offset, y_offset)):
+                    collides.append(self.views[index])
+
+        return collides
+
+
+    def get_cell(self, row, col):
+        """Returns the GridCell at (row, col), or None if that slot is outside
+        the formation or has no cell
+        """
+
+        if 0 <= row < self.rows and 0 <= col < self.cols:
+            return self.views[row * self.cols + col]
+
+        return None
+
+
+    def get_cell_row_col(self, cell):
+        """Returns the (row, col) tuple for the given cell's location in the formation"""
+
+        return (cell.row, cell.col)
+
+
+    def get_bounds(self):
+        """Returns a Rect around the whole formation"""
+
+        return Rect(self.get_cell_topleft(0, 0), self.composite.get_size())
+
+
+    def get_cell_topleft(self, row, col):
+        """Returns the screen position of the cell at (row, col)"""
+
+        return (self.left + (col - self.target_position[1]) * self.cell_width,
+                self.top + (row - self.target_position[0]) * self.cell_height)
+
+
+    def is_marked(self, index):
+        mark_tick = self.mark_ticks[index]
+        return mark_tick is not None and self.tick - mark_tick <= MARK_TIME
+
+
+    def can_eat(self):
+        return self.delay == 0
+
+    def start_delay(self, delay_amount):
+        self.delay = delay_amount
+
+
+
+class GridCell():
+    """Stand-in for a cell sprite at one slot of a GridShield.
+    Its rect is computed from the shield when asked for.
+    """
+
+    def __init__(self, shield, row, col):
+        self.shield = shield
+        self.row = row
+        self.col = col
+        self.index = row * shield.cols + col
+
+        self.image = shield.image
+        self.mask = shield.mask
+
+
+    def get_topleft(self):
+        return self.shield.get_cell_topleft(self.row, self.col)
+
+
+    @property
+    def rect(self):
+        return Rect(self.get_topleft(), (self.shield.cell_width, self.shield.cell_height))
+
+
+    @property
+    def marked(self):
+        return self.shield.is_marked(self.index)
+
+
+    def mark(self):
+        """Marks the cell. A marked cell can be eaten by the player"""
+
+        self.shield.mark_ticks[self.index] = self.shield.tick
+
+
+    def kill(self):
+        self.shield.remove(self)
+
+
+    def alive(self):
+        return self in self.shield
@@ -0,0 +1,366 @@
+"""
+
+headless.py
+
+Runs the game loop without a display for benchmarking and automated runs.
+
+Uses the SDL dummy video driver, does not cap the framerate, and can skip
+drawing entirely. Input comes from a PlayerScript (or a ScriptedInput) instead
+of the keyboard.
+
+usage: python headless.py [frames] [--seed N] [--draw] [--trace] [--allocations] [--gc]
+
+"""
+
+import os
+import sys
+import random
+import argparse
+from timeit import default_timer
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+import pygame
+from pygame.locals import *
+
+import options as opt
+from cannon import Cannon
+from dirty_rects import DirtyRects
+from alloc_audit import AllocationAudit
+import tracer
+
+
+class HeldKeys():
+    """Stand-in for pygame.key.get_pressed(); indexable by key constants"""
+
+    def __init__(self, held=()):
+        self.held = set(held)
+
+    def __getitem__(self, key):
+        return key in self.held
+
+
+class KeyEvent():
+    """Minimal stand-in for a pygame KEYDOWN event"""
+
+    def __init__(self, key):
+        self.type = KEYDOWN
+        self.key = key
+
+
+
+class ScriptedInput():
+    """Replays a fixed input script frame by frame.
+
+    presses is a dict from frame number to a list of keys pressed (KEYDOWN) on that frame
+    holds is a list of (first_frame, last_frame, key) tuples for keys held down
+    (inclusive); if repeat is set, the script loops every repeat frames
+    """
+
+    def __init__(self, presses=None, holds=None, repeat=None):
+        self.presses = presses or {}
+        self.holds = holds or []
+        self.repeat = repeat
+
+
+    def get(self, frame):
+        """Returns the (events, keys) pair for the given frame"""
+
+        if self.repeat:
+            frame = frame % self.repeat
+
+        events = [KeyEvent(k) for k in self.presses.get(frame, ())]
+        keys = HeldKeys(k for first, last, k in self.holds if first <= frame <= last)
+
+        return events, keys
+
+
+class PlayerScript():
+    """Plays the game by looking at the current level, so runs exercise
+    collisions: the player follows the enemy base up and down, eats and shoots
+    shield cells for energy, activates the cannon on the left edge, fires it
+    where the base will be, steps out of the shot's way, catches it if it
+    bounces back and steps away from the homing bullet. Other screens are
+    passed with space presses.
+
+    The same seed (see seed()) always gives the same game.
+    """
+
+    def __init__(self, manager):
+        self.manager = manager
+
+        #the enemy base's centery last frame, to tell how fast it moves
+        self.last_enemy_y = None
+
+
+    def get(self, frame):
+        """Returns the (events, keys) pair for the given frame"""
+
+        manager = self.manager
+        level = getattr(manager, "level", None)
+        if level is None or manager.get_state() is not level:
+            return ([KeyEvent(K_SPACE)] if frame % 3 == 0 else []), HeldKeys()
+
+        player = level.player.rect
+        enemy = level.enemy.rect
+        cannon = level.cannon.rect
+        held = []
+        events = []
+
+        velocity = 0 if self.last_enemy_y is None else enemy.centery - self.last_enemy_y
+        self.last_enemy_y = enemy.centery
+
+        #with the cannon ready, aim where the base will be when a shot gets there
+        cannon_state = level.cannon.get_state_number()
+        target_y = enemy.centery
+        if cannon_state == Cannon.STANDBY:
+            target_y += velocity * max(enemy.left - player.right, 0) // opt.firing_cannon_speed
+
+        dy = target_y - player.centery
+        if abs(dy) > 6:
+            held.append(K_DOWN if dy > 0 else K_UP)
+
+        if cannon_state == Cannon.DEACTIVATED:
+            #eat into the shield until there is energy for the cannon, then go get it
+            held.append(K_RIGHT if manager.energy < opt.cannon_energy_cost else K_LEFT)
+        elif cannon_state == Cannon.STANDBY:
+            #the shot starts on the left edge in the player's row, so stand
+            #far enough right to get out of its way after firing
+            if player.left < 100:
+                held.append(K_RIGHT)
+            elif player.left > 140:
+                held.append(K_LEFT)
+            if abs(dy) < 8 and player.left >= 60:
+                events.append(KeyEvent(K_SPACE))
+        elif cannon_state == Cannon.FIRING:
+            if cannon.right <= player.left and abs(cannon.centery - player.centery) < 25:
+                held = [K_UP if player.centery > opt.height // 2 else K_DOWN]
+        elif cannon_state == Cannon.RETURNING:
+            held.append(K_LEFT)
+
+        homer = level.hbullet.rect
+        if abs(homer.centerx - player.centerx) < 45 and abs(homer.centery - player.centery) < 45:
+            held = [K_LEFT if homer.centerx > player.centerx else K_RIGHT,
+                    K_UP if homer.centery > player.centery else K_DOWN]
+
+        if frame % 97 == 0 or (cannon_state == Cannon.DEACTIVATED and frame % 9 == 0):
+            events.append(KeyEvent(K_SPACE))
+
+        return events, HeldKeys(held)
+
+
+
+def default_script(manager):
+    """The input used by main(): a PlayerScript playing manager's game"""
+
+    return PlayerScript(manager)
+
+
+def init_display():
+    """Initializes pygame on the dummy video driver and returns the screen"""
+
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    pygame.init()
+
+    #a display mode is still needed so convert_alpha() works when loading sprites
+    screen = pygame.display.set_mode(opt.window_size)
+
+    import bundle
+    bundle.preload()
+
+    return screen
+
+
+def run(manager, frames, script, screen=None, display=None, audit=None):
+    """Steps manager for the given number of frames as fast as possible
+
+    If screen is None, draw() is skipped entirely. If display (a
+    dirty_rects.DirtyRects) is given, each drawn frame is pushed through it.
+    If audit (an alloc_audit.AllocationAudit) is given, each frame is audited.
+
+    Returns a list of per-frame times in seconds.
+    """
+
+    frame_times = []
+    last_state = None
+
+    for frame in range(frames):
+        #the script stands in for the player, so its own work (and allocations)
+        #are left out of the frame
+        events, keys = script.get(frame)
+
+        start = default_timer()
+        if audit is not None:
+            audit.begin_frame()
+
+        manager.handle_events(events, keys)
+        updated_state = manager.get_state()
+        manager.update()
+
+        if screen is not None:
+            screen.fill(opt.black)
+            manager.draw(screen)
+
+        if display is not None:
+            state = manager.get_state()
+            display.update(manager.get_dirty_rects(), state is not last_state)
+            last_state = state
+
+        if audit is not None:
+            audit.end_frame(updated_state)
+
+        finish = default_timer()
+        frame_times.append(finish - start)
+        tracer.span("frame", start, finish)
+
+    return frame_times
+
+
+def seed(value):
+    """Seeds random and numpy.random, which the enemy base and the ion field
+    noise use, so runs with the same seed play out the same way
+    """
+
+    random.seed(value)
+    if numpy is not None:
+        numpy.random.seed(value)
+
+
+def report(frame_times):
+    """Returns a summary string of frames/sec and per-frame cost"""
+
+    total = sum(frame_times)
+    frames = len(frame_times)
+    ordered = sorted(frame_times)
+
+    return ("{0} frames in {1:.3f}s: {2:.1f} frames/sec, "
+            "mean {3:.3f}ms, median {4:.3f}ms, max {5:.3f}ms per frame").format(
+                frames, total, frames / total if total else 0.0,
+                1000 * total / frames, 1000 * ordered[frames // 2], 1000 * ordered[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless fixed-step benchmark")
+    parser.add_argument("frames", type=int, nargs="?", default=opt.headless_frames)
+    parser.add_argument("--seed", type=int, default=opt.headless_seed,
+                        help="seed for random and numpy.random (default %(default)s)")
+    parser.add_argument("--draw", action="store_true", help="also draw every frame")
+    parser.add_argument("--dirty", action="store_true",
+                        help="draw every frame and push only the changed rects to the display")
+    parser.add_argument("--collisions", action="store_true",
+                        help="list the collision matrix rules")
+    parser.add_argument("--trace", action="store_true",
+                        help="write a Chrome trace-event file of the run (see tracer.py)")
+    parser.add_argument("--allocations", action="store_true",
+                        help="count allocations per frame by state and call site (see alloc_audit.py); "
+                             "fails if Level frames go over the allocation budgets or none were audited")
+    parser.add_argument("--gc", action="store_true",
+                        help="time garbage collections by state (see gc_policy.py)")
+    parser.add_argument("--no-gc-policy", action="store_true",
+                        help="leave garbage collection to Python, for comparison with --gc")
+    args = parser.parse_args(argv)
+
+    seed(args.seed)
+    screen = init_display()
+
+    if args.no_gc_policy:
+        opt.gc_policy = False
+
+    from yarsmanager import YarsManager
+    manager = YarsManager()
+    if args.gc:
+        manager.gc_policy.install()
+
+    if args.trace:
+        tracer.enable(opt.trace_max_events)
+
+    audit = None
+    if args.allocations:
+        audit = AllocationAudit(opt.allocation_audit_top)
+        audit.start()
+
+    display = DirtyRects(screen.get_rect()) if args.dirty else None
+    frame_times = run(manager, args.frames, default_script(manager),
+                      screen if args.draw or args.dirty else None, display, audit)
+    print(report(frame_times))
+
+    if display is not None:
+        pixels = display.get_pixels_per_frame()
+        print("dirty rects: {0:.0f} pixels updated per frame ({1:.1f}% of the window), "
+              "{2} full updates".format(pixels, 100 * pixels / (opt.width * opt.height),
+                                        display.full_updates))
+
+    from ion_field import noise_frames_memory
+    count, size = noise_frames_memory()
+    print("{0} cached noise frames using {1:.1f}KB".format(count, size / 1024.0))
+
+    level = getattr(manager, "level", None)
+    if level is not None:
+        broad_phase = level.broad_phase
+        print("broad phase: {0} pairs considered, {1} candidates, {2} mask tests".format(
+            broad_phase.pairs_considered, broad_phase.candidate_pairs, broad_phase.mask_tests))
+        if level.overlap_tables is not None:
+            count, size = level.overlap_tables.memory()
+            print("{0} overlap tables using {1:.1f}KB".format(count, size / 1024.0))
+        print("collision context: {0} queries remembered, {1} computed".format(
+            level.context.hits, level.context.misses))
+        print("swept collisions: {0} sweeps, {1} hits found along the way".format(
+            level.context.sweeps, level.context.swept_hits))
+
+        queue = level.render_queue
+        if queue is not None and queue.draw_calls:
+            print("render queue: {0} draw calls, {1} blits, {2} culled".format(
+                queue.draw_calls, queue.blit_count, queue.culled))
+
+        from level import COLLISIONS
+        print("collision matrix: {0} live pairs, {1} dead pairs skipped".format(
+            COLLISIONS.live_pairs, COLLISIONS.dead_pairs))
+        if args.collisions:
+            print("\n".join(COLLISIONS.describe()))
+
+    import assets
+    print("asset cache: {hits} hits, {misses} misses, {images} images, "
+          "{masks} masks, {sheets} sheets".format(**assets.get_stats()))
+
+    if args.gc:
+        manager.gc_policy.uninstall()
+        print("\n".join(manager.gc_policy.get_report()))
+
+    if audit is not None:
+        audit.stop()
+        print("\n".join(audit.get_report()))
+        return check_allocation_budget(audit)
+
+    return 0
+
+
+def check_allocation_budget(audit):
+    """Returns 0 if Level frames stayed within options.level_allocation_budget
+    kept blocks and options.level_peak_bytes_budget peak bytes on average,
+    and 1 if they went over either or no Level frame was audited
+    """
+
+    level = audit.get_state("Level")
+    if level is None:
+        print("Level allocation budget: no Level frames were audited (failed)")
+        return 1
+
+    kept = level.per_frame(level.kept_blocks)
+    peak = level.per_frame(level.peak_bytes)
+    kept_within = kept <= opt.level_allocation_budget
+    peak_within = peak <= opt.level_peak_bytes_budget
+
+    print("Level allocation budget: {0:.1f} kept blocks per frame, budget {1} ({2})".format(
+        kept, opt.level_allocation_budget, "ok" if kept_within else "over budget"))
+    print("Level peak bytes budget: {0:.0f}B per frame, budget {1}B ({2})".format(
+        peak, opt.level_peak_bytes_budget, "ok" if peak_within else "over budget"))
+
+    return 0 if kept_within and peak_within else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -24,12 +24,21 @@ class InfoScreen(GameState):
     def __init__(self, manager, score, lives, next_state):
         GameState.__init__(self, manager)
 
-        sys_font = Font(get_default_font(), options.font_size)
-        self.score_text = sys_font.render(str(score), True, options.white)
-        self.lives_text = sys_font.render(str(lives), True, options.white)
+        self.sys_font = Font(get_default_font(), options.font_size)
+        self.reset(score, lives, next_state)
+
+
+    def reset(self, score, lives, next_state):
+        """Shows new score and lives and leads to next_state, so one InfoScreen can be reused"""
+
+        self.score_text = self.sys_font.render(str(score), True, options.white)
+        self.lives_text = self.sys_font.render(str(lives), True, options.white)
 
         self.next_state = next_state
 
+        #the next frame is drawn in full
+        self.redraw = True
+
 
     def handle_events(self, events, keys):
         return (event_handlers.check_quit(events, keys) and
@@ -46,5 +55,15 @@ class InfoScreen(GameState):
                     self.lives_text.get_rect(midright = (right_edge, lives_height)))
 
 
+    def get_dirty_rects(self):
+        """nothing changes after the first frame following reset()"""
+
+        if self.redraw:
+            self.redraw = False
+            return None
+
+        return []
+
+
     def change_state(self):
         self.manager.change_state(self.next_state)
\ No newline at end of file
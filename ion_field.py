@@ -8,6 +8,12 @@ This is the neutral zone in the middle of the screen.
 
 from random import randint, choice
 
+try:
+    import numpy
+    from pygame import surfarray
+except ImportError:
+    numpy = None
+
 import pygame
 from pygame import draw
 from pygame import Surface
@@ -18,15 +24,41 @@ from pygame.mask import Mask
 
 from statemachine import Manager, State
 from asprite import ASprite
+import tracer
 
 COLORS = [(0, 0, 0), (0, 0, 0), (0, 0, 0), (0, 0, 0), (0, 0, 0), (0, 0, 0), (0, 0, 0), 
           (255, 0, 0), (0, 255, 0), (0, 0, 255),
           (200, 150, 0), (200, 200, 0), (150, 0, 200), (0, 150, 200)]
 
+if numpy is not None:
+    COLOR_ARRAY = numpy.array(COLORS, dtype=numpy.uint8)
+
+#number of palette entries used by palette mode IonFields
+PALETTE_SIZE = 256
+
+#upper limit on the number of pre-generated noise frames per field size
+MAX_NOISE_FRAMES = 64
+
+#pre-generated noise frames shared by all IonFields of the same size
+#dictionary from (width, height, noise_width, noise_height) to list of Surfaces
+noise_frames = {}
+
 class IonField(Sprite):
-    """Sprite that draws a bunch of random horizontal lines inside a rectangle."""
-    
-    def __init__(self, left, top, width, height, noise_width, noise_height, delay):
+    """Sprite that draws a bunch of random horizontal lines inside a rectangle.
+
+    If frames is nonzero, that many frames of noise (up to MAX_NOISE_FRAMES)
+    are generated once and cycled through instead of generating noise live.
+    The frames are shared with every IonField of the same size, so they must
+    not be drawn on. If prebake is False they are generated on first use
+    instead of at construction.
+
+    If palette is True, the image is an 8-bit surface of random palette indices
+    drawn once, and new noise only reshuffles the palette. This costs the same
+    regardless of the field's size; frames is ignored in this mode.
+    """
+
+    def __init__(self, left, top, width, height, noise_width, noise_height, delay,
+                 frames=0, prebake=True, palette=False):
         Sprite.__init__(self)
 
         self.top = top
@@ -34,7 +66,10 @@ class IonField(Sprite):
         self.width = width
         self.height = height
 
-        self.image = Surface((self.width, self.height))
+        if palette:
+            self.image = Surface((self.width, self.height), 0, 8)
+        else:
+            self.image = Surface((self.width, self.height))
         self.rect = Rect(left, top, self.width, self.height)
         self.rect = Rect(left, top, 0, 0)
         self.mask = Mask((self.width, self.height))
@@ -46,6 +81,18 @@ class IonField(Sprite):
         self.tick = 0
         self.delay = delay
 
+        self.palette = palette
+        if palette:
+            frames = 0
+            self.image.set_palette([COLORS[0]] * PALETTE_SIZE)
+            fill_indices(self.image, noise_width, noise_height)
+
+        self.frames = min(frames, MAX_NOISE_FRAMES)
+        self.frame_index = 0
+        self.noise_frames = None
+        if self.frames and prebake:
+            self.load_noise_frames()
+
 
     def update(self):
         self.tick = self.tick + 1
@@ -55,10 +102,143 @@ class IonField(Sprite):
 
     def draw(self, screen):
         screen.blit(self.image, self.rect)
+
+
+    def get_blits(self):
+        return [(self.image, self.rect)]
+
+
+    def is_changed(self):
+        """True if the last update() made new noise"""
+
+        return self.tick % self.delay == 0
     
 
     def generate_noise(self):
-        for col in range(0, self.image.get_width(), self.noise_width):
-            for row in range(0, self.image.get_height(), self.noise_height):
-                c = choice(COLORS)
-                draw.rect(self.image, c, Rect(col, row, self.noise_width, self.noise_height))
+        """Shuffles the palette in palette mode, shows the next pre-generated
+        frame if frames are used, and otherwise fills the image with new noise
+        """
+
+        start = tracer.begin()
+        if self.palette:
+            self.image.set_palette([choice(COLORS) for i in range(PALETTE_SIZE)])
+        elif self.frames:
+            self.next_noise_frame()
+        else:
+            fill_noise(self.image, self.noise_width, self.noise_height)
+        tracer.end("IonField.generate_noise", start)
+
+
+    def load_noise_frames(self):
+        width, height = self.image.get_size()
+        self.noise_frames = get_noise_frames(width, height, self.noise_width,
+                                             self.noise_height, self.frames)
+
+
+    def next_noise_frame(self):
+        """Advances to the next frame in the ring of pre-generated frames"""
+
+        if self.noise_frames is None:
+            self.load_noise_frames()
+
+        self.image = self.noise_frames[self.frame_index]
+        self.frame_index = (self.frame_index + 1) % len(self.noise_frames)
+
+
+
+def get_noise_frames(width, height, noise_width, noise_height, count):
+    """Returns a list of at least count (up to MAX_NOISE_FRAMES) noise Surfaces
+    of the given size, generating only the ones not already cached
+    """
+
+    key = (width, height, noise_width, noise_height)
+    frames = noise_frames.setdefault(key, [])
+    count = min(count, MAX_NOISE_FRAMES)
+
+    while len(frames) < count:
+        frame = Surface((width, height))
+        fill_noise(frame, noise_width, noise_height)
+        frames.append(frame)
+
+    return frames[:count]
+
+
+def noise_frames_memory():
+    """Returns the (frame count, bytes of pixel data) used by all cached noise frames"""
+
+    count = 0
+    size = 0
+    for frames in noise_frames.values():
+        for frame in frames:
+            count += 1
+            size += frame.get_width() * frame.get_height() * frame.get_bytesize()
+
+    return count, size
+
+
+def clear_noise_frames():
+    """Drops all cached noise frames. IonFields already holding frames keep them."""
+
+    noise_frames.clear()
+
+
+def fill_noise(surface, noise_width, noise_height):
+    """Fills surface with random blocks of noise_width x noise_height.
+    Uses NumPy when available, otherwise falls back to drawing block by block.
+    """
+
+    if numpy is not None:
+        fill_noise_array(surface, noise_width, noise_height)
+    else:
+        fill_noise_loop(surface, noise_width, noise_height)
+
+
+def fill_indices(surface, noise_width, noise_height):
+    """Fills an 8-bit surface with blocks of random palette indices"""
+
+    if numpy is not None:
+        width, height = surface.get_size()
+        if width == 0 or height == 0:
+            return
+
+        indices = random_blocks(width, height, noise_width, noise_height, PALETTE_SIZE)
+        surfarray.blit_array(surface, indices.astype(numpy.uint8))
+    else:
+        for col in range(0, surface.get_width(), noise_width):
+            for row in range(0, surface.get_height(), noise_height):
+                index = randint(0, PALETTE_SIZE - 1)
+                draw.rect(surface, index, Rect(col, row, noise_width, noise_height))
+
+
+def random_blocks(width, height, noise_width, noise_height, count):
+    """Returns a width x height array of random integers below count,
+    constant over each noise_width x noise_height block
+    """
+
+    cols = -(-width // noise_width)
+    rows = -(-height // noise_height)
+
+    indices = numpy.random.randint(0, count, (cols, rows))
+    indices = indices.repeat(noise_width, axis=0).repeat(noise_height, axis=1)
+
+    return indices[:width, :height]
+
+
+def fill_noise_array(surface, noise_width, noise_height):
+    """Draws the whole grid of color indices in one call and writes it
+    into the surface through surfarray, upscaling blocks by repeating
+    """
+
+    width, height = surface.get_size()
+    if width == 0 or height == 0:
+        return
+
+    indices = random_blocks(width, height, noise_width, noise_height, len(COLORS))
+    surfarray.blit_array(surface, COLOR_ARRAY[indices])
+
+
+def fill_noise_loop(surface, noise_width, noise_height):
+    for col in range(0, surface.get_width(), noise_width):
+        for row in range(0, surface.get_height(), noise_height):
+            c = choice(COLORS)
+            draw.rect(surface, c, Rect(col, row, noise_width, noise_height))
@@ -9,8 +9,9 @@ Contains the Level class, which is the state for one game level
 import math
 
 import pygame
+from timeit import default_timer
 from pygame.locals import *
-from pygame.sprite import Sprite, Group, collide_mask, spritecollide, groupcollide
+from pygame.sprite import Sprite, Group
 
 from gamestate import GameState
 from levelends import DeathAnimation, WinAnimation
@@ -23,9 +24,62 @@ from ship import Ship, Bullet
 from enemy_base import EnemyBase
 from formations import formation, formation_center
 from enemy_shield import EnemyShield
+from grid_shield import GridShield
 from homing_bullet import HomingBullet
 from cannon import Cannon
-from ion_field import IonField
+from ion_field import IonField, get_noise_frames
+from spatial_hash import SpatialHash
+from collision_context import CollisionContext
+from overlap_tables import OverlapTables
+from dirty_rects import image_rect
+from render_queue import RenderQueue
+import assets
+import tracer
+from statemachine import Manager
+from collision_matrix import CollisionMatrix, ANY
+
+#dictionary from collision kind to the Level attribute holding that entity
+#("bullet" is every sprite in Level.player_bullets)
+ENTITY_ATTRIBUTES = {"player": "player", "enemy": "enemy", "shield": "shield",
+                     "hbullet": "hbullet", "cannon": "cannon"}
+
+#which pairs can collide in which states, and the Level method handling each
+#pairs are checked in this order; a pair in states not listed here is skipped
+COLLISIONS = CollisionMatrix({
+    "enemy": {EnemyBase.MOVING: "MOVING", EnemyBase.SPINNING: "SPINNING",
+              EnemyBase.SHOOTING: "SHOOTING"},
+    "cannon": {Cannon.DEACTIVATED: "DEACTIVATED", Cannon.STANDBY: "STANDBY",
+               Cannon.FIRING: "FIRING", Cannon.RETURNING: "RETURNING"}})
+
+COLLISIONS.add("player", ANY, "hbullet", ANY, "hit_by_hbullet")
+
+COLLISIONS.add("player", ANY, "enemy", EnemyBase.MOVING, "touch_mover")
+COLLISIONS.add("player", ANY, "enemy", EnemyBase.SPINNING, "hit_by_enemy")
+COLLISIONS.add("player", ANY, "enemy", EnemyBase.SHOOTING, "hit_by_enemy")
+
+COLLISIONS.add("player", ANY, "shield", ANY, "player_hit_cell")
+
+#a standby cannon follows the player around, so touching it does nothing
+COLLISIONS.add("player", ANY, "cannon", Cannon.DEACTIVATED, "activate_cannon")
+COLLISIONS.add("player", ANY, "cannon", Cannon.FIRING, "hit_by_cannon")
+COLLISIONS.add("player", ANY, "cannon", Cannon.RETURNING, "catch_cannon")
+
+COLLISIONS.add("cannon", Cannon.FIRING, "shield", ANY, "cannon_hit_cell")
+
+COLLISIONS.add("cannon", Cannon.FIRING, "enemy", EnemyBase.MOVING, "destroy_mover")
+COLLISIONS.add("cannon", Cannon.FIRING, "enemy", EnemyBase.SPINNING, "destroy_spinner")
+COLLISIONS.add("cannon", Cannon.FIRING, "enemy", EnemyBase.SHOOTING, "destroy_shooter")
+
+COLLISIONS.add("bullet", ANY, "shield", ANY, "bullet_hit_cell")
+
+#trace span name for each kind pair in COLLISIONS
+COLLISION_SPANS = dict((pair, "collisions {0}/{1}".format(*pair)) for pair in COLLISIONS.pairs)
+
+#render queue layers, drawn in this order
+BACKGROUND_LAYER = 0
+ENEMY_LAYER = 1
+PLAYER_LAYER = 2
+LAYERS = 3
 
 class Level(GameState):
     """Level is a GameState with behavior for one full game level.
@@ -47,17 +101,38 @@ class Level(GameState):
 
         self.player = Ship(*opt.player_args)
         self.enemy = EnemyBase(opt.mover_args, opt.spinner_args, opt.shooter_args, self.player)
-        self.shield = EnemyShield(self.enemy, opt.shield_filename, formation, formation_center)
+        if opt.grid_shield:
+            self.shield = GridShield(self.enemy, opt.shield_filename, formation, formation_center)
+        else:
+            self.shield = EnemyShield(self.enemy, opt.shield_filename, formation, formation_center)
         self.hbullet = HomingBullet(opt.homer_filename, self.player, opt.homer_speed)
         self.cannon = Cannon(opt.deactivated_cannon_args, opt.standby_cannon_args,
                              opt.firing_cannon_args, self.player)
         self.ion_field = IonField(*opt.ion_field_args)
         self.player_bullets = Group()
 
+        self.preload_explosion()
+
+        #broad phase for collisions, refilled every frame, and the queries made this frame
+        self.broad_phase = SpatialHash(opt.broad_phase_cell_size)
+        self.overlap_tables = self.build_overlap_tables() if opt.overlap_tables else None
+        self.context = CollisionContext(self.broad_phase, self.shield, self.overlap_tables,
+                                        opt.swept_collisions,
+                                        assets.load_image(opt.shield_filename).get_size())
+
+        if opt.render_queue:
+            self.render_queue = RenderQueue((0, 0, opt.width, opt.height), LAYERS)
+        else:
+            self.render_queue = None
+
+        self.collision_time = 0.0
+
         self.reset_positions()
         
 
     def update(self):
+        starts = self.get_sweep_starts()
+
         self.player.update()
         self.enemy.update()
         self.shield.update()
@@ -66,7 +141,12 @@ class Level(GameState):
         self.player_bullets.update()
         self.ion_field.update()
         
-        self.collisions()
+        start = default_timer()
+        self.collisions(self.get_motion(starts))
+        #seconds the last collisions() took, for the performance overlay
+        finish = default_timer()
+        self.collision_time = finish - start
+        tracer.span("Level.collisions", start, finish)
 
 
     def handle_events(self, events, keys):
@@ -76,6 +156,10 @@ class Level(GameState):
 
 
     def draw(self, screen):
+        if self.render_queue is not None:
+            self.draw_queued(screen)
+            return
+
         self.ion_field.draw(screen)
         self.enemy.draw(screen)
         self.shield.draw(screen)
@@ -85,99 +169,315 @@ class Level(GameState):
         self.player_bullets.draw(screen)
 
 
-    def collisions(self):
+    def draw_queued(self, screen):
+        """Same as draw, but through the render queue"""
+
+        queue = self.render_queue
+
+        queue.add_blits(BACKGROUND_LAYER, self.ion_field)
+        queue.add_blits(ENEMY_LAYER, self.enemy)
+        queue.add_blits(ENEMY_LAYER, self.shield)
+        queue.add_blits(PLAYER_LAYER, self.player)
+        queue.add_blits(PLAYER_LAYER, self.hbullet)
+        queue.add_blits(PLAYER_LAYER, self.cannon)
+        queue.add_sprites(PLAYER_LAYER, self.player_bullets)
+
+        queue.flush(screen)
+
+
+    def get_dirty_rects(self):
+        """Every sprite's drawn area, and the ion field's when its noise changed"""
+
+        rects = [image_rect(sprite) for sprite in (self.enemy, self.player, self.hbullet, self.cannon)]
+        rects.extend(image_rect(bullet) for bullet in self.player_bullets)
+        rects.append(self.shield.get_bounds())
+
+        if self.ion_field.is_changed():
+            rects.append(image_rect(self.ion_field))
+
+        return rects
+
+
+    def build_overlap_tables(self):
+        """Precomputes collision tables for the mask pairs tested every frame:
+        each player frame against the homing bullet, the cannon and a shield cell,
+        and the bullet and cannon against a shield cell
+        """
+
+        tables = OverlapTables(opt.overlap_table_bytes)
+
+        player_masks = [mask for row in self.player.masks for mask in row]
+        cell_mask = assets.load_mask(opt.shield_filename)
+        cannon_masks = [assets.load_mask(opt.standby_cannon_filename),
+                        assets.load_mask(opt.firing_cannon_filename)]
+
+        #most important first, in case the memory limit is reached
+        tables.add_pairs(player_masks, [cell_mask, self.hbullet.mask] + cannon_masks)
+        tables.add_pairs([assets.load_mask(opt.bullet_filename)] + cannon_masks, [cell_mask])
+
+        if opt.grid_shield:
+            self.shield.overlap_tables = tables
+
+        return tables
+
+
+    def get_sweep_starts(self):
+        """Returns a dictionary from each sprite that may move in a straight line
+        this update (and the shield) to its position and state number before moving
+        """
+
+        starts = dict((bullet, (bullet.rect.topleft, None)) for bullet in self.player_bullets)
+        starts[self.cannon] = (self.cannon.rect.topleft, self.cannon.get_state_number())
+        starts[self.enemy] = (self.enemy.rect.topleft, self.enemy.get_state_number())
+        starts[self.shield] = (self.shield.get_bounds().topleft, None)
+
+        return starts
+
+
+    def get_motion(self, starts):
+        """Returns a dictionary from each sprite that moved in a straight line
+        since starts was taken to the (dx, dy) it moved:
+        player bullets, the cannon while firing or returning, the enemy base
+        while shooting, and the shield
+        """
+
+        motion = {}
+        straight_states = {self.cannon: (Cannon.FIRING, Cannon.RETURNING),
+                           self.enemy: (EnemyBase.SHOOTING, )}
+
+        enemy_start, enemy_state = starts[self.enemy]
+
+        for sprite, (start, state_number) in starts.items():
+            if sprite is self.shield:
+                #the shield jumps after the enemy base when it resumes moving;
+                #only count it when it followed the same enemy sprite
+                if self.enemy.get_state_number() != enemy_state: continue
+                end = self.shield.get_bounds().topleft
+                if (end[0] - start[0], end[1] - start[1]) != (
+                    self.enemy.rect.left - enemy_start[0], self.enemy.rect.top - enemy_start[1]): continue
+            elif sprite in straight_states:
+                #a sprite that changed state jumped to another state's sprite
+                if (state_number not in straight_states[sprite] or
+                    sprite.get_state_number() != state_number): continue
+                end = sprite.rect.topleft
+            elif sprite.alive():
+                end = sprite.rect.topleft
+            else:
+                continue
+
+            if end != start:
+                motion[sprite] = (end[0] - start[0], end[1] - start[1])
+
+        return motion
+
+
+    def preload_explosion(self):
+        """Generates the win explosion's noise frames now, while the level is
+        being set up, instead of in the frame the enemy base is destroyed
+        """
+
+        if opt.exp_noise_frames and opt.exp_prebake and not opt.exp_palette:
+            get_noise_frames(opt.exp_width, opt.exp_height, opt.exp_noise_width,
+                             opt.exp_noise_height, opt.exp_noise_frames)
+
+
+    def begin_collisions(self, motion=None):
+        """Starts a new collision context with every collidable sprite at its current position;
+        motion is as returned by get_motion()
+        """
+
+        sprites = [self.player, self.enemy, self.hbullet, self.cannon, self.ion_field]
+        sprites.extend(self.player_bullets)
+        self.context.begin_frame(sprites, motion)
+
+
+    def collisions(self, motion=None):
         """Handles collisions
+
+        Goes through the pairs in COLLISIONS in order. Pairs that are dead in
+        the entities' current states (every entity of a kind shares its state)
+        are skipped before any geometry. For live ones, only the entities the
+        broad phase finds near the right one are tested, and the handler is
+        called for each hit.
         """
 
-        player = self.player
-        enemy = self.enemy
-        shield = self.shield
-        hbullet = self.hbullet
-        cannon = self.cannon
-        ion_field = self.ion_field
-        player_bullets = self.player_bullets
-        
-        #player with homing bullet
-        if collide_mask(player, hbullet) and not collide_mask(player, ion_field):
+        self.begin_collisions(motion)
+        context = self.context
+
+        for left_kind, right_kind in COLLISIONS.pairs:
+            span_start = tracer.begin()
+            handler = COLLISIONS.get_handler(left_kind, self.get_state_number(left_kind),
+                                             right_kind, self.get_state_number(right_kind))
+            pair_count = len(self.player_bullets) if left_kind == "bullet" else 1
+
+            if handler is None:
+                COLLISIONS.dead_pairs += pair_count
+                tracer.end(COLLISION_SPANS[(left_kind, right_kind)], span_start)
+                continue
+
+            COLLISIONS.live_pairs += pair_count
+            right = self.get_entities(right_kind)[0]
+
+            #find every hit before handling any, since handlers can remove things
+            hits = []
+            for left in self.get_candidates(left_kind, right):
+                if right_kind == "shield":
+                    cells = context.collide_shield(left)
+                    if len(cells) > 0:
+                        hits.append((handler, left, cells))
+                elif context.collide(left, right):
+                    hits.append((handler, left, right))
+
+            for handler, left, right in hits:
+                getattr(self, handler)(left, right)
+
+            tracer.end(COLLISION_SPANS[(left_kind, right_kind)], span_start)
+
+
+    def get_entities(self, kind):
+        """Returns a list of the collidable entities of the given kind"""
+
+        if kind == "bullet":
+            return self.player_bullets.sprites()
+
+        return [getattr(self, ENTITY_ATTRIBUTES[kind])]
+
+
+    def get_candidates(self, kind, other):
+        """Returns a list of the collidable entities of the given kind
+        that pass the broad phase against other
+        """
+
+        candidates = self.context.get_candidates(other)
+
+        if kind == "bullet":
+            return [sprite for sprite in candidates if sprite in self.player_bullets]
+
+        entity = getattr(self, ENTITY_ATTRIBUTES[kind])
+        return [entity] if entity in candidates else []
+
+
+    def get_state_number(self, kind):
+        """Returns the current state number of the given kind of entity,
+        or Manager.STATELESS if it has no states
+        """
+
+        if kind == "enemy":
+            return self.context.get_state_number(self.enemy)
+        if kind == "cannon":
+            return self.context.get_state_number(self.cannon)
+
+        return Manager.STATELESS
+
+
+    #collision handlers; see COLLISIONS for when each one is called
+
+    def hit_by_hbullet(self, player, hbullet):
+        """the homing bullet can't hit the player inside the ion field"""
+
+        if not self.context.collide(player, self.ion_field):
             self.kill_player()
-        
-        #player with enemy base
-        if collide_mask(player, enemy):
-            #if base in moving phase, give player energy
-            if enemy.get_state_number() == EnemyBase.MOVING:
-                self.manager.give_energy(opt.energy_from_enemy)
-            #if base in spinning or shooting phase, kill player
-            elif enemy.get_state_number() == EnemyBase.SPINNING:
-                self.kill_player()
-            elif enemy.get_state_number() == EnemyBase.SHOOTING:
-                self.kill_player()
-                
-        #player with cell
-        #-hitting a cell will bounce the player a bit to the left
-        #-if the player hit the cell twice in a short enough span,
-        # the cell is eaten and the player gets energy
-        #-in case of multiple collisions, deal with cell closest to player's center
-        #
-        #TODO: This still isn't quite right.
-        #Should be able to eat top/bottom rows with diagonal movement.
-        #(vertical movement should still move player all the way left)
-        pc_collides = spritecollide(player, shield, False, collide_mask)
-        center_cell = self.find_centermost_cell(pc_collides)
-        if center_cell is not None:
-            player.rect.right = center_cell.rect.left - opt.cell_bounceback
-            
-            if not center_cell.marked:
-                center_cell.mark()
-            elif shield.can_eat():
-                center_cell.kill()
-                self.manager.give_energy(opt.energy_from_cell)
-                self.manager.add_score(opt.score_cell_eat)
-                shield.start_delay(opt.frames_to_eat_cell)
-            
-        #player with cannon
-        if collide_mask(player, cannon):
-            #if in deactivated phase, try spending required energy to activate
-            if (cannon.get_state_number() == Cannon.DEACTIVATED and 
-                self.manager.spend_energy(opt.cannon_energy_cost)):
-                cannon.start_standby()
-            #if in firing phase, kill player
-            if cannon.get_state_number() == Cannon.FIRING:
-                self.kill_player()
-            #if in returning phase, give energy and deactivate cannon
-            if cannon.get_state_number() == Cannon.RETURNING:
-                cannon.start_transition(Cannon.DEACTIVATED)
-                self.manager.give_energy(opt.energy_from_cannon)
-                
-        #cannon with cell
-        #kill one cell and reverse cannon direction
-        #assuming this is only possible if cannon in firing state
-        if cannon.get_state_number() == Cannon.FIRING:
-            cannon_collides = spritecollide(cannon, shield, False, collide_mask)
-            if len(cannon_collides) > 0:
-                cannon_collides[0].kill()
-                self.manager.add_score(opt.score_cell_shoot)
-                cannon.start_transition(Cannon.RETURNING)
-            
-        #cannon with enemy base -- only if cannon in firing state
-        #give points corresponding to enemy state and end level
-        #if enemy base is in shooting state, player also gets a life
-        if cannon.get_state_number() == Cannon.FIRING and collide_mask(cannon, enemy):
-            if enemy.get_state_number() == EnemyBase.MOVING:
-                self.manager.add_score(opt.score_mover_destroy)
-            elif enemy.get_state_number() == EnemyBase.SPINNING:
-                self.manager.add_score(opt.score_spinner_destroy)
-            elif enemy.get_state_number() == EnemyBase.SHOOTING:
-                self.manager.add_score(opt.score_shooter_destroy)
-                self.manager.give_life()
-            self.end_level()
-        
-        #player's bullet with cell
-        #kill player bullet but remove cells in a cross pattern
-        #if somehow one bullet hits multiple cells one is arbitrarily selected
-        bc_collides = groupcollide(player_bullets, shield, True, False, collide_mask)
-        for current_bullet in bc_collides.keys():
-            self.manager.add_score(opt.score_cell_shoot)
-            shield.remove_cross(bc_collides[current_bullet][0])
+
+
+    def touch_mover(self, player, enemy):
+        """touching the base in its moving phase gives player energy"""
+
+        self.manager.give_energy(opt.energy_from_enemy)
+
+
+    def hit_by_enemy(self, player, enemy):
+        """touching the base in its spinning or shooting phase kills player"""
+
+        self.kill_player()
+
+
+    def player_hit_cell(self, player, cells):
+        """-hitting a cell will bounce the player a bit to the left
+        -if the player hit the cell twice in a short enough span,
+         the cell is eaten and the player gets energy
+        -in case of multiple collisions, deal with cell closest to player's center
+
+        TODO: This still isn't quite right.
+        Should be able to eat top/bottom rows with diagonal movement.
+        (vertical movement should still move player all the way left)
+        """
+
+        shield = self.shield
+        center_cell = self.find_centermost_cell(cells)
+
+        player.rect.right = center_cell.rect.left - opt.cell_bounceback
+        self.context.invalidate(player)
+
+        if not center_cell.marked:
+            center_cell.mark()
+        elif shield.can_eat():
+            center_cell.kill()
+            self.context.invalidate(shield)
+            self.manager.give_energy(opt.energy_from_cell)
+            self.manager.add_score(opt.score_cell_eat)
+            shield.start_delay(opt.frames_to_eat_cell)
+
+
+    def activate_cannon(self, player, cannon):
+        """in deactivated phase, try spending required energy to activate"""
+
+        if self.manager.spend_energy(opt.cannon_energy_cost):
+            cannon.start_standby()
+            self.context.invalidate(cannon)
+
+
+    def hit_by_cannon(self, player, cannon):
+        """in firing phase, kill player"""
+
+        self.kill_player()
+
+
+    def catch_cannon(self, player, cannon):
+        """in returning phase, give energy and deactivate cannon"""
+
+        cannon.start_transition(Cannon.DEACTIVATED)
+        self.manager.give_energy(opt.energy_from_cannon)
+        self.context.invalidate(cannon)
+
+
+    def cannon_hit_cell(self, cannon, cells):
+        """kill one cell and reverse cannon direction"""
+
+        cells[0].kill()
+        self.context.invalidate(self.shield)
+        self.manager.add_score(opt.score_cell_shoot)
+        cannon.start_transition(Cannon.RETURNING)
+        self.context.invalidate(cannon)
+
+
+    #destroying the enemy base gives points corresponding to its state and ends level
+    #if enemy base is in shooting state, player also gets a life
+
+    def destroy_mover(self, cannon, enemy):
+        self.manager.add_score(opt.score_mover_destroy)
+        self.end_level()
+
+
+    def destroy_spinner(self, cannon, enemy):
+        self.manager.add_score(opt.score_spinner_destroy)
+        self.end_level()
+
+
+    def destroy_shooter(self, cannon, enemy):
+        self.manager.add_score(opt.score_shooter_destroy)
+        self.manager.give_life()
+        self.end_level()
+
+
+    def bullet_hit_cell(self, bullet, cells):
+        """kill player bullet but remove cells in a cross pattern
+        if somehow one bullet hits multiple cells one is arbitrarily selected
+        """
+
+        bullet.kill()
+        self.manager.add_score(opt.score_cell_shoot)
+        self.shield.remove_cross(cells[0])
+        self.context.invalidate(self.shield)
 
 
     def find_centermost_cell(self, cells):
@@ -205,10 +505,11 @@ class Level(GameState):
         as long as options.max_player_bullets won't be exeeded
         """
         
-        if collide_mask(self.player, self.ion_field):
+        if self.context.collide(self.player, self.ion_field):
             return
 
         if self.cannon.start_transition(Cannon.FIRING):
+            self.context.invalidate(self.cannon)
             return        
         
         if len(self.player_bullets) < opt.max_player_bullets:
@@ -217,6 +518,18 @@ class Level(GameState):
             self.player_bullets.add(new_bullet)
 
 
+    def reset(self):
+        """Returns the level to how a newly built Level starts, reusing all sprites:
+        shield regrown, enemy base back at the top of its path, and everything
+        reset_positions() does
+        """
+
+        self.shield.regrow()
+        self.enemy.start_mover()
+        self.ion_field.tick = 0
+        self.reset_positions()
+
+
     def reset_positions(self):
         """Moves sprites to their initial locations:
         player starts in left center facing south and with 0 energy
@@ -235,6 +548,8 @@ class Level(GameState):
         self.cannon.start_deactivated()
         self.hbullet.rect.center = self.enemy.rect.center
 
+        self.begin_collisions()
+
 
     def kill_player(self):
         death_animation = DeathAnimation(self.manager, self.player, (self.enemy, self.shield), self,
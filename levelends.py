@@ -6,6 +6,7 @@ levelends.py
 
 import pygame
 from pygame.locals import *
+from pygame.rect import Rect
 from pygame.sprite import Sprite, Group, collide_mask, spritecollide, groupcollide
 
 from gamestate import GameState
@@ -19,6 +20,7 @@ from enemy_shield import EnemyShield
 from homing_bullet import HomingBullet
 from cannon import Cannon
 from shrinking_ion_field import ShrinkingIonField
+from dirty_rects import image_rect
 
 class DeathAnimation(GameState):
     """Plays an animation where the player spins around in a circle
@@ -60,6 +62,12 @@ class DeathAnimation(GameState):
             curr.draw(screen)
 
 
+    def get_dirty_rects(self):
+        """only the player changes; the other sprites stay still"""
+
+        return [image_rect(self.player)]
+
+
 class WinAnimation(GameState):
     """All sprites but the player disappear. The player has free movement for a few seconds.
     """
@@ -92,3 +100,7 @@ class WinAnimation(GameState):
     def draw(self, screen):
         self.explosion.draw(screen)
         self.player.draw(screen)
+
+
+    def get_dirty_rects(self):
+        return [Rect(self.explosion.rect), image_rect(self.player)]
@@ -16,6 +16,47 @@ max_framerate = 60
 black = (0, 0, 0)
 white = (255, 255, 255)
 
+#push only the changed parts of the screen to the display each frame
+dirty_rects = True
+
+#draw the level through a render queue: one Surface.blits() call per layer,
+#skipping blits that would draw nothing
+render_queue = True
+
+#performance overlay (toggled with F3): number of frames its statistics and
+#graph cover, and number of frames between redraws of its text and graph
+hud_visible = False
+hud_frames = 240
+hud_refresh = 15
+
+#record a Chrome trace-event file (see tracer.py), written on exit or with F4;
+#events recorded after trace_max_events are dropped until the next write
+trace = False
+trace_max_events = 1000000
+
+#profiler (see profiler.py): F5 starts and stops it, F6 profiles the next
+#profile_frames frames; the summary lists the top profile_top functions
+profile_frames = 120
+profile_top = 30
+profile_sort = "cumulative"
+
+#allocation audit (headless.py --allocations): call sites listed per state, and
+#the most blocks a Level frame may allocate and keep on average, and the most
+#bytes it may have allocated at once on average (counting short-lived objects);
+#set about 15% above a default headless run (which wins a level)
+allocation_audit_top = 8
+level_allocation_budget = 66
+level_peak_bytes_budget = 5600
+
+#keep one Title, InfoScreen and Level and reset them in place
+#instead of rebuilding them on every transition (see yarsmanager.py)
+reuse_states = True
+
+#schedule garbage collection around state changes (see gc_policy.py): levels
+#run with these collection thresholds, and the info and title screens collect
+gc_policy = True
+gc_level_thresholds = (50000, 50, 1000)
+
 #font options
 font_size = 15
 
@@ -40,6 +81,19 @@ max_energy = 255
 cell_bounceback = 15
 frames_to_eat_cell = 15
 
+#size of the squares the collision broad phase divides the playfield into
+broad_phase_cell_size = 100
+
+#precompute collision tables for the player, shield cell, bullet and cannon masks
+#(off by default: on masks this small the lookups are no faster than collide_mask)
+overlap_tables = False
+#memory limit for those tables, in bytes
+overlap_table_bytes = 256 * 1024
+
+#test bullets, the fired cannon and the shooting enemy base along their path
+#when they move far enough in one update to pass through what they could hit
+swept_collisions = True
+
 #maximum number of player bullets on the screen
 max_player_bullets = 1
 
@@ -50,6 +104,12 @@ death_animation_total_runtime = 64
 #win animation constants
 win_animation_total_runtime = 240
 
+#sprite bundle (atlas and precomputed masks, built by bundle.py)
+#the sprites are loaded from the individual image files if the bundle does not exist
+#or was built from different files (run bundle.py again after changing a sprite)
+use_bundle = True
+bundle_filename = "graphics/sprites.bundle"
+
 #constructor arguments for sprites
 
 #player options
@@ -88,6 +148,8 @@ shooter_args = (shooter_filename, shooter_height, shooter_width, shooter_animati
                 
 #enemy shield
 shield_filename = "graphics/cell2.png"
+#use GridShield (cells stored as arrays) instead of EnemyShield (one sprite per cell)
+grid_shield = True
 
 #homing bullet
 homer_filename = "graphics/bullet.png"
@@ -115,7 +177,13 @@ ion_height = height
 ion_delay = 6
 ion_noise_width = 15
 ion_noise_height = 2
-ion_field_args = (ion_left, ion_top, ion_width, ion_height, ion_noise_width, ion_noise_height, ion_delay)
+#number of pre-generated noise frames to cycle through; 0 generates noise live
+ion_noise_frames = 16
+ion_prebake = True
+#8-bit field whose noise is refreshed by reshuffling the palette; ignores ion_noise_frames
+ion_palette = False
+ion_field_args = (ion_left, ion_top, ion_width, ion_height, ion_noise_width, ion_noise_height, ion_delay,
+                  ion_noise_frames, ion_prebake, ion_palette)
 
 #explosion field (full-width shrinking ion field)
 exp_left = 0
@@ -126,4 +194,14 @@ exp_delay = 6
 exp_noise_width = 15
 exp_noise_height = 2
 exp_rate = 2
-exp_field_args = (exp_left, exp_top, exp_width, exp_height, exp_noise_width, exp_noise_height, exp_delay, exp_rate)
+exp_noise_frames = 8
+exp_prebake = True
+exp_palette = False
+exp_field_args = (exp_left, exp_top, exp_width, exp_height, exp_noise_width, exp_noise_height, exp_delay, exp_rate,
+                  exp_noise_frames, exp_prebake, exp_palette)
+
+#headless benchmark runner (see headless.py)
+headless_frames = 3600
+headless_script_length = 3600
+#seed for random and numpy.random, so runs are repeatable
+headless_seed = 1
@@ -0,0 +1,110 @@
+"""
+
+overlap_tables.py
+
+Precomputed collision tables for pairs of fixed masks.
+
+Whether two masks overlap depends only on their offset from each other, so for
+masks that never change (sprite frames from the asset cache) every answer can
+be worked out once. Each table holds one byte per possible offset, built with
+Mask.convolve, so a test becomes an index into a bytes object.
+
+"""
+
+import pygame
+
+
+class OverlapTables():
+    """Tables for chosen pairs of masks, using at most max_bytes in total.
+    Pairs that would go over the limit are left out and tested normally.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+
+        #dictionary from left mask to dictionary from right mask to
+        #(table, width, height, x shift, y shift)
+        self.tables = {}
+
+        self.count = 0
+        self.bytes = 0
+        self.skipped = 0
+
+
+    def add(self, left_mask, right_mask):
+        """Builds the table for left_mask tested against right_mask;
+        returns False if it doesn't fit in the memory limit
+        """
+
+        right_tables = self.tables.setdefault(left_mask, {})
+        if right_mask in right_tables:
+            return True
+
+        left_width, left_height = left_mask.get_size()
+        right_width, right_height = right_mask.get_size()
+        width = left_width + right_width - 1
+        height = left_height + right_height - 1
+
+        if width <= 0 or height <= 0 or self.bytes + width * height > self.max_bytes:
+            self.skipped += 1
+            return False
+
+        #bit (x, y) of the convolution is set when right_mask overlaps
+        #left_mask at offset (x - right_width + 1, y - right_height + 1)
+        convolution = left_mask.convolve(right_mask).to_surface()
+        table = pygame.image.tostring(convolution, "RGBA")[0::4]
+
+        right_tables[right_mask] = (table, width, height, right_width - 1, right_height - 1)
+        self.count += 1
+        self.bytes += width * height
+        return True
+
+
+    def add_pairs(self, left_masks, right_masks):
+        """Adds a table for every left mask against every right mask"""
+
+        for left_mask in left_masks:
+            for right_mask in right_masks:
+                self.add(left_mask, right_mask)
+
+
+    def get_overlap(self, left_mask, right_mask):
+        """Returns a function overlap(right_mask, offset) giving the truth value
+        of left_mask.overlap(right_mask, offset); a table lookup if the pair has one
+        """
+
+        entry = self.tables.get(left_mask, {}).get(right_mask)
+        if entry is None:
+            return left_mask.overlap
+
+        table, width, height, x_shift, y_shift = entry
+
+        def overlap(mask, offset):
+            x = offset[0] + x_shift
+            y = offset[1] + y_shift
+            return 0 <= x < width and 0 <= y < height and table[y * width + x] != 0
+
+        return overlap
+
+
+    def collide(self, left, right):
+        """Same truth value as collide_mask(left, right)"""
+
+        left_mask = left.mask
+        right_mask = right.mask
+        offset = (right.rect[0] - left.rect[0], right.rect[1] - left.rect[1])
+
+        entry = self.tables.get(left_mask, {}).get(right_mask)
+        if entry is None:
+            return left_mask.overlap(right_mask, offset)
+
+        table, width, height, x_shift, y_shift = entry
+        x = offset[0] + x_shift
+        y = offset[1] + y_shift
+        return 0 <= x < width and 0 <= y < height and table[y * width + x] != 0
+
+
+    def memory(self):
+        """Returns (number of tables, bytes used by them)"""
+
+        return (self.count, self.bytes)
@@ -0,0 +1,171 @@
+"""
+
+perf_hud.py
+
+Contains the PerfHUD class, an on-screen overlay showing where frame time goes.
+
+Each frame the main loop records how long input handling, updating (with
+Level.collisions counted on its own as well), drawing and the display flip
+took. The overlay shows the mean, median (p50) and 99th percentile (p99) of
+each over the last frames, and a graph of whole frame times.
+
+The overlay is kept on one pre-drawn surface that is only redrawn every few
+frames, and rendered text is cached, so showing it costs one blit most frames.
+
+"""
+
+from collections import deque
+
+import pygame
+from pygame import Surface, draw
+from pygame.rect import Rect
+
+#phases recorded each frame, in display order
+#(collisions is part of update)
+PHASES = ("input", "update", "collisions", "draw", "flip")
+
+GRAPH_HEIGHT = 40
+LINE_SPACING = 2
+MARGIN = 4
+
+#text surfaces cached before the cache is emptied
+MAX_CACHED_TEXTS = 256
+
+TEXT_COLOR = (255, 255, 255)
+BACKGROUND_COLOR = (0, 0, 0)
+GRAPH_COLOR = (0, 200, 0)
+SLOW_COLOR = (255, 0, 0)
+BUDGET_COLOR = (200, 200, 0)
+
+
+def percentile(ordered, fraction):
+    """Returns the value fraction of the way through an already sorted list"""
+
+    if len(ordered) == 0:
+        return 0.0
+
+    return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+
+
+class PerfHUD():
+    """Keeps the last frames' phase times (in seconds) and draws them.
+
+    font is used for the text, frames is how many frames the statistics and
+    graph cover, refresh is the number of frames between redraws, and
+    frame_budget is the time (in seconds) one frame should take, marked on the graph.
+    """
+
+    def __init__(self, font, frames, refresh, frame_budget, visible=False):
+        self.font = font
+        self.frames = frames
+        self.refresh = refresh
+        self.frame_budget = frame_budget
+        self.visible = visible
+
+        self.times = dict((phase, deque(maxlen=frames)) for phase in PHASES)
+        self.totals = deque(maxlen=frames)
+
+        #dictionary from string to its rendered Surface
+        self.texts = {}
+        self.panel = None
+        self.ticks_since_refresh = 0
+
+
+    def toggle(self):
+        self.visible = not self.visible
+        self.panel = None
+
+
+    def record(self, input_time, update_time, collision_time, draw_time, flip_time):
+        """Adds one frame's phase times, in seconds"""
+
+        times = self.times
+        times["input"].append(input_time)
+        times["update"].append(update_time)
+        times["collisions"].append(collision_time)
+        times["draw"].append(draw_time)
+        times["flip"].append(flip_time)
+        self.totals.append(input_time + update_time + draw_time + flip_time)
+
+        self.ticks_since_refresh += 1
+
+
+    def draw(self, screen):
+        """Draws the overlay in the top left corner if it is visible;
+        returns the Rect drawn, or None
+        """
+
+        if not self.visible:
+            return None
+
+        if self.panel is None or self.ticks_since_refresh >= self.refresh:
+            self.panel = self.draw_panel()
+            self.ticks_since_refresh = 0
+
+        return screen.blit(self.panel, (0, 0))
+
+
+    def get_lines(self):
+        """Returns the overlay's text, one string per line"""
+
+        lines = ["{0} frames  mean / p50 / p99 ms".format(len(self.totals))]
+        for phase in PHASES + ("total", ):
+            values = self.totals if phase == "total" else self.times[phase]
+            ordered = sorted(values)
+            mean = sum(ordered) / len(ordered) if ordered else 0.0
+            lines.append("{0}: {1:.2f} / {2:.2f} / {3:.2f}".format(
+                phase, 1000 * mean, 1000 * percentile(ordered, 0.5), 1000 * percentile(ordered, 0.99)))
+
+        return lines
+
+
+    def render_text(self, text):
+        """font.render, but each string is only rendered once"""
+
+        surface = self.texts.get(text)
+        if surface is None:
+            if len(self.texts) >= MAX_CACHED_TEXTS:
+                self.texts.clear()
+            surface = self.texts[text] = self.font.render(text, False, TEXT_COLOR)
+
+        return surface
+
+
+    def draw_panel(self):
+        """Draws the text and the frame time graph on the panel surface,
+        which is only replaced when its size changes; returns the panel
+        """
+
+        text_surfaces = [self.render_text(line) for line in self.get_lines()]
+        line_height = self.font.get_linesize() + LINE_SPACING
+
+        width = max([self.frames] + [surface.get_width() for surface in text_surfaces]) + 2 * MARGIN
+        text_height = line_height * len(text_surfaces)
+        height = text_height + GRAPH_HEIGHT + 3 * MARGIN
+
+        panel = self.panel
+        if panel is None or panel.get_size() != (width, height):
+            panel = Surface((width, height))
+        panel.fill(BACKGROUND_COLOR)
+
+        for i, surface in enumerate(text_surfaces):
+            panel.blit(surface, (MARGIN, MARGIN + i * line_height))
+
+        self.draw_graph(panel, Rect(MARGIN, 2 * MARGIN + text_height, self.frames, GRAPH_HEIGHT))
+        return panel
+
+
+    def draw_graph(self, panel, area):
+        """One vertical line per frame; the graph's height is two frame budgets"""
+
+        scale = area.height / (2.0 * self.frame_budget)
+        budget_y = area.bottom - int(self.frame_budget * scale)
+
+        for i, total in enumerate(self.totals):
+            x = area.left + i
+            top = max(area.bottom - int(total * scale), area.top)
+            color = SLOW_COLOR if total > self.frame_budget else GRAPH_COLOR
+            draw.line(panel, color, (x, area.bottom - 1), (x, top))
+
+        draw.line(panel, BUDGET_COLOR, (area.left, budget_y), (area.right - 1, budget_y))
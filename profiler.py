@@ -0,0 +1,140 @@
+"""
+
+profiler.py
+
+Contains the Profiler class, which runs cProfile over a stretch of the main
+loop chosen while playing, instead of over the whole program.
+
+Profiling is started and stopped on frame boundaries, either by toggling it
+or by asking for exactly the next few frames. When it stops, the statistics
+are written to a .pstats file named after the time (for pstats or snakeviz)
+along with a text summary of the top functions.
+
+"""
+
+import os
+import time
+import pstats
+import cProfile
+
+
+def unique_name(prefix, extension):
+    """Returns prefix followed by the current time down to the millisecond,
+    with a counter added if a file with that name and extension exists already
+    """
+
+    now = time.time()
+    name = "{0}-{1}-{2:03d}".format(prefix, time.strftime("%Y%m%d-%H%M%S", time.localtime(now)),
+                                    int(now * 1000) % 1000)
+
+    result = name
+    count = 1
+    while os.path.exists(result + extension):
+        count += 1
+        result = "{0}-{1}".format(name, count)
+
+    return result
+
+
+
+class Profiler():
+    """Profiles whole frames of the main loop.
+
+    The main loop calls begin_frame() at the start of each frame and
+    end_frame() at the end. top is the number of functions listed in the text
+    summary and sort_key is the pstats sort order for it.
+    """
+
+    def __init__(self, top, sort_key="cumulative"):
+        self.top = top
+        self.sort_key = sort_key
+
+        self.profile = None
+        self.pending = False
+        self.running = False
+
+        #frames left to capture, or None when profiling until toggled off
+        self.frames_left = None
+        self.frames = 0
+        #names of the GameStates seen while profiling
+        self.states = []
+
+        #path of the last .pstats file written
+        self.last_path = None
+
+
+    def toggle(self):
+        """Starts profiling from the next frame, or stops at the end of this one"""
+
+        if self.running or self.pending:
+            self.frames_left = 0
+            self.pending = False
+        else:
+            self.frames_left = None
+            self.pending = True
+
+
+    def capture(self, frames):
+        """Profiles exactly the next frames frames"""
+
+        if self.running: return
+
+        self.frames_left = frames
+        self.pending = frames > 0
+
+
+    def begin_frame(self):
+        if not self.pending: return
+
+        self.pending = False
+        self.running = True
+        self.frames = 0
+        self.states = []
+        self.profile = cProfile.Profile()
+        self.profile.enable()
+
+
+    def end_frame(self, state):
+        """Counts the frame (spent in the GameState state) and stops
+        profiling if it was the last one wanted
+        """
+
+        if not self.running: return
+
+        self.frames += 1
+        name = type(state).__name__
+        if name not in self.states:
+            self.states.append(name)
+
+        if self.frames_left is not None:
+            self.frames_left -= 1
+            if self.frames_left <= 0:
+                self.stop()
+
+
+    def stop(self):
+        """Stops profiling and writes the results; returns the .pstats path"""
+
+        self.profile.disable()
+        self.running = False
+        self.frames_left = None
+
+        path = self.dump(unique_name("profile", ".pstats"))
+        self.profile = None
+        return path
+
+
+    def dump(self, name):
+        """Writes name.pstats and a summary in name.txt"""
+
+        stats_path = name + ".pstats"
+        self.profile.dump_stats(stats_path)
+
+        with open(name + ".txt", "w") as f:
+            f.write("{0} frames in {1}\n\n".format(self.frames, ", ".join(self.states)))
+            stats = pstats.Stats(self.profile, stream=f)
+            stats.sort_stats(self.sort_key).print_stats(self.top)
+
+        self.last_path = stats_path
+        print("wrote profile " + stats_path)
+        return stats_path
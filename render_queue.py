@@ -0,0 +1,78 @@
+"""
+
+render_queue.py
+
+Contains the RenderQueue class, which collects the blits for one frame and
+submits them together with Surface.blits().
+
+Drawables hand over what they would blit through get_blits(), which returns a
+list of (surface, position) pairs. Blits that would draw nothing (empty
+surfaces or ones entirely off the screen) are dropped before submitting.
+
+"""
+
+from pygame.rect import Rect
+
+
+class RenderQueue():
+    """Blits grouped into layers, drawn in layer order and in the order they
+    were added within a layer. Each non-empty layer is one Surface.blits() call.
+
+    Keeps counters for profiling: draw_calls is the number of blits() calls,
+    blit_count the number of blits submitted and culled the number dropped.
+    """
+
+    def __init__(self, screen_rect, layers):
+        self.screen_rect = Rect(screen_rect)
+        self.layers = [[] for layer in range(layers)]
+
+        self.draw_calls = 0
+        self.blit_count = 0
+        self.culled = 0
+
+
+    def add(self, layer, surface, position):
+        """Queues surface to be blitted with its top left at position
+        (a point or a Rect), unless it would draw nothing
+        """
+
+        left, top = position[0], position[1]
+        width, height = surface.get_size()
+
+        if width == 0 or height == 0 or not self.screen_rect.colliderect((left, top, width, height)):
+            self.culled += 1
+            return
+
+        self.layers[layer].append((surface, (left, top)))
+
+
+    def add_blits(self, layer, drawable):
+        """Queues everything drawable.get_blits() returns"""
+
+        for surface, position in drawable.get_blits():
+            self.add(layer, surface, position)
+
+
+    def add_sprites(self, layer, sprites):
+        """Queues each sprite's image at its rect, like Group.draw"""
+
+        for sprite in sprites:
+            self.add(layer, sprite.image, sprite.rect)
+
+
+    def flush(self, screen):
+        """Draws every queued blit to screen and empties the queue"""
+
+        for blits in self.layers:
+            if len(blits) == 0: continue
+
+            screen.blits(blits, False)
+            self.draw_calls += 1
+            self.blit_count += len(blits)
+            del blits[:]
+
+
+    def reset_counters(self):
+        self.draw_calls = 0
+        self.blit_count = 0
+        self.culled = 0
@@ -8,39 +8,48 @@ This is used for the explosion effect in the win animation
 
 import pygame
 from pygame import draw
-from pygame import Surface
 from pygame import PixelArray
 from pygame.sprite import Sprite
 from pygame.rect import Rect
-from pygame.mask import Mask
 
 from ion_field import IonField
 
 class ShrinkingIonField(IonField):
-    """IonField which will smoothly shrink from the top and bottom every frame"""
+    """IonField which will smoothly shrink from the top and bottom every frame
 
-    def __init__(self, left, top, width, height, noise_width, noise_height, delay, shrink_rate):
-        IonField.__init__(self, left, top, width, height, noise_width, noise_height, delay)
+    Shrinking allocates nothing: image stays the full-size noise and rect is
+    narrowed in place, with area marking the part of image still shown.
+    Collision with this field is rect-only; the mask is not kept in sync.
+    """
+
+    def __init__(self, left, top, width, height, noise_width, noise_height, delay, shrink_rate,
+                 frames=0, prebake=True, palette=False):
+        IonField.__init__(self, left, top, width, height, noise_width, noise_height, delay,
+                          frames, prebake, palette)
 
         self.shrink_rate = shrink_rate
         self.crop_top = int(shrink_rate / 2)
 
+        self.rect = Rect(self.left, self.top, self.width, self.height)
+        self.area = Rect(0, 0, self.width, self.height)
+
     def update(self):
         self.shrink()
         IonField.update(self)
 
 
-    def shrink(self):
-        self.height = max(self.height - self.shrink_rate, 0)
+    def draw(self, screen):
+        screen.blit(self.image, self.rect, self.area)
 
-        #copy the existing noise, cropping off the top and bottom
-        temp_image = Surface((self.width, self.height))
-        temp_image.blit(self.image, Rect(0, 0, 0, 0), Rect(0, self.crop_top, self.width, self.height))
-        self.image = temp_image
-        
-        self.mask = Mask((self.width, self.height))
-        self.mask.fill()
 
+    def shrink(self):
+        """crops off the top and bottom by moving rect and area in place"""
+
+        self.height = max(self.height - self.shrink_rate, 0)
         self.top = self.top + self.crop_top
 
-        self.rect = Rect(self.left, self.top, self.width, self.height)
+        self.rect.top = self.top
+        self.rect.height = self.height
+
+        self.area.top += self.crop_top
+        self.area.height = self.height
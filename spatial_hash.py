@@ -0,0 +1,127 @@
+"""
+
+spatial_hash.py
+
+A uniform spatial hash used as a broad phase for collision detection.
+
+The playfield is divided into square buckets. Each frame the items are
+inserted with their rects; the candidates for colliding with an item are then
+found by looking only in the buckets it touches, and only those whose rects
+overlap are passed on to the more expensive mask tests.
+
+"""
+
+from pygame.rect import Rect
+
+
+def footprint(sprite):
+    """Returns the area a sprite can collide in with collide_mask: its mask
+    placed at rect.topleft. (IonField's rect has no size, for example.)
+    """
+
+    return Rect(sprite.rect.topleft, sprite.mask.get_size())
+
+
+
+class SpatialHash():
+    """Buckets items by the cell_size x cell_size squares their rects touch.
+
+    Keeps counters for profiling: pairs_considered is the number of pairs
+    looked at by queries (items sharing a bucket), candidate_pairs the number
+    whose rects overlapped, and mask_tests is for callers to count the narrow
+    phase tests they ran.
+    """
+
+    def __init__(self, cell_size):
+        self.cell_size = cell_size
+
+        #dictionary from (col, row) to list of items
+        self.buckets = {}
+        #dictionary from item to (rect, list of bucket keys)
+        self.items = {}
+
+        self.pairs_considered = 0
+        self.candidate_pairs = 0
+        self.mask_tests = 0
+
+
+    def clear(self):
+        self.buckets.clear()
+        self.items.clear()
+
+
+    def insert(self, item, rect):
+        """Adds item with the given rect; an item already in the hash is moved"""
+
+        if item in self.items:
+            self.remove(item)
+
+        keys = self.get_keys(rect)
+        for key in keys:
+            self.buckets.setdefault(key, []).append(item)
+
+        self.items[item] = (Rect(rect), keys)
+
+
+    def remove(self, item):
+        rect, keys = self.items.pop(item)
+        for key in keys:
+            self.buckets[key].remove(item)
+
+
+    def get_keys(self, rect):
+        """Returns the keys of every bucket rect touches; none if rect has no area"""
+
+        if rect.width <= 0 or rect.height <= 0:
+            return []
+
+        size = self.cell_size
+        return [(col, row)
+                for col in range(rect.left // size, (rect.right - 1) // size + 1)
+                for row in range(rect.top // size, (rect.bottom - 1) // size + 1)]
+
+
+    def query(self, rect, exclude=None):
+        """Returns a list of the items (other than exclude) whose rects overlap rect"""
+
+        found = []
+        seen = set()
+        for key in self.get_keys(rect):
+            for item in self.buckets.get(key, ()):
+                if item in seen or item is exclude: continue
+
+                seen.add(item)
+                self.pairs_considered += 1
+                if self.items[item][0].colliderect(rect):
+                    self.candidate_pairs += 1
+                    found.append(item)
+
+        return found
+
+
+    def query_item(self, item):
+        """Returns a list of the other items whose rects overlap item's;
+        none if item was not inserted
+        """
+
+        if item not in self.items:
+            return []
+
+        return self.query(self.items[item][0], item)
+
+
+    def may_collide(self, left, right):
+        """Returns True if the rects left and right were inserted with overlap.
+        Items that were not inserted never collide.
+        """
+
+        if left not in self.items or right not in self.items:
+            return False
+
+        return self.items[left][0].colliderect(self.items[right][0])
+
+
+    def reset_counters(self):
+        self.pairs_considered = 0
+        self.candidate_pairs = 0
+        self.mask_tests = 0
@@ -9,6 +9,8 @@ Contains the classes Manager and State for implementing state machine sprites.
 import pygame
 from pygame.sprite import Sprite
 
+import tracer
+
 class Manager(Sprite):
     """Manager is a Sprite which serves as a universal accessor for the states.
     It contains integer constants for identifying the states as well as the methods
@@ -49,6 +51,10 @@ class Manager(Sprite):
         screen.blit(self.image, self.rect)
 
 
+    def get_blits(self):
+        return [(self.image, self.rect)]
+
+
     def start_transition(self, new_state_number):
         """causes the current state to transition to the state
         corresponding to new_state_number
@@ -58,6 +64,7 @@ class Manager(Sprite):
 
 
     def change_state(self, new_state):
+        tracer.transition(self, new_state)
         self.current_state = new_state
         self.update_sprite_attributes()
     
@@ -97,6 +104,15 @@ class State():
         pass
 
 
+    def reset(self, *args):
+        """Re-arms a pooled state with new arguments before it becomes the
+        current state again, so transitions don't need to build new states.
+        Should only write attributes; no new sprites or surfaces.
+        """
+
+        pass
+
+
     def get_rect(self):
         if self.sprite is None: return None
         return self.sprite.rect
@@ -111,6 +127,7 @@ class State():
         if self.sprite is None: return None
         return self.sprite.mask
 
+
     
     def transition_to(self, new_state_number):
         """Contains the state's transition rules and behavior. This will generally
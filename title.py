@@ -36,8 +36,11 @@ class Title(GameState):
 
 
     def draw(self, screen):
-        sys_font = Font(get_default_font(), options.font_size)
-
-
         screen.blit(self.message1, self.message1.get_rect(center = (400, 100)))
         screen.blit(self.message2, self.message2.get_rect(center = (400, 150)))
+
+
+    def get_dirty_rects(self):
+        """the title screen never changes once shown"""
+
+        return []
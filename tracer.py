@@ -0,0 +1,133 @@
+"""
+
+tracer.py
+
+An opt-in tracer that records timed spans and instant events and writes them
+in the Chrome trace-event JSON format, for chrome://tracing or Perfetto.
+
+Events are kept in memory and only written by write() (on exit, or when the
+trace hotkey is pressed), so tracing does no I/O during a frame. While tracing
+is off, begin() and the other functions return right away.
+
+usage:
+    start = tracer.begin()
+    ...
+    tracer.end("IonField.generate_noise", start)
+
+"""
+
+import os
+import json
+import atexit
+from timeit import default_timer
+
+from profiler import unique_name
+
+#buffered trace events, as dictionaries in the trace-event format
+events = []
+
+#enabled: whether events are being recorded
+#origin: default_timer() value that timestamps are measured from
+#max_events: events recorded before further ones are dropped
+#dropped: number of events dropped since the last write
+state = {"enabled": False, "origin": default_timer(), "max_events": 0, "dropped": 0}
+
+PID = os.getpid()
+TID = 1
+
+
+def enable(max_events):
+    """Starts recording; the buffer is written when the program exits"""
+
+    if not state["enabled"]:
+        atexit.register(write_on_exit)
+
+    state["enabled"] = True
+    state["max_events"] = max_events
+
+
+def disable():
+    state["enabled"] = False
+    try:
+        atexit.unregister(write_on_exit)
+    except AttributeError:
+        pass
+
+
+def is_enabled():
+    return state["enabled"]
+
+
+def timestamp(seconds):
+    """Returns a default_timer() value as microseconds since the origin"""
+
+    return (seconds - state["origin"]) * 1000000.0
+
+
+def record(event):
+    if len(events) >= state["max_events"]:
+        state["dropped"] += 1
+        return
+
+    events.append(event)
+
+
+def begin():
+    """Returns the start time for end(), or None if tracing is off"""
+
+    if not state["enabled"]:
+        return None
+
+    return default_timer()
+
+
+def end(name, start, category="game"):
+    """Records a span called name from start (as returned by begin()) until now"""
+
+    if start is None:
+        return
+
+    span(name, start, default_timer(), category)
+
+
+def span(name, start, finish, category="game"):
+    """Records a span between two default_timer() values taken by the caller"""
+
+    if not state["enabled"]:
+        return
+
+    record({"name": name, "cat": category, "ph": "X", "pid": PID, "tid": TID,
+            "ts": timestamp(start), "dur": (finish - start) * 1000000.0})
+
+
+def transition(owner, new_state):
+    """Records an instant event for owner changing to new_state"""
+
+    if not state["enabled"]:
+        return
+
+    name = "{0} -> {1}".format(type(owner).__name__, type(new_state).__name__)
+    record({"name": name, "cat": "state", "ph": "i", "s": "t", "pid": PID, "tid": TID,
+            "ts": timestamp(default_timer())})
+
+
+def write(path=None):
+    """Writes the buffered events to path (by default a file in the current
+    directory named after the time), empties the buffer and returns the path
+    """
+
+    if path is None:
+        path = unique_name("trace", ".json") + ".json"
+
+    metadata = {"dropped_events": state["dropped"]}
+    with open(path, "w") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms", "otherData": metadata}, f)
+
+    del events[:]
+    state["dropped"] = 0
+    return path
+
+
+def write_on_exit():
+    if len(events) > 0:
+        print("wrote trace " + write())
@@ -11,6 +11,7 @@ from gamestate import GameManager
 from title import Title
 from infoscreen import InfoScreen
 from level import Level
+from gc_policy import GCPolicy
 
 class YarsManager(GameManager):
     """YarsManager is a GameManager which provides universal methods to change state.
@@ -20,7 +21,21 @@ class YarsManager(GameManager):
     """
 
     def __init__(self):
-        GameManager.__init__(self, Title(self))
+        """With options.reuse_states, one Title, InfoScreen, and Level are kept
+        and reset in place instead of being rebuilt on every transition
+        """
+
+        self.title = Title(self)
+        self.info_screen = None
+        self.level = None
+        self.gc_policy = GCPolicy(options.gc_policy, options.gc_level_thresholds)
+
+        GameManager.__init__(self, self.title)
+
+
+    def change_state(self, new_state):
+        GameManager.change_state(self, new_state)
+        self.gc_policy.change_state(new_state)
 
     
     def new_game(self):
@@ -40,18 +55,24 @@ class YarsManager(GameManager):
         """Go to intermediate screen then return to title
         """
 
-        title_screen = Title(self)
-        info_screen = InfoScreen(self, self.score, '', title_screen)
-        self.change_state(info_screen)
+        if options.reuse_states:
+            title_screen = self.title
+        else:
+            title_screen = Title(self)
+
+        self.show_info(self.score, '', title_screen)
 
 
     def next_level(self):
         """Go to intermediate screen then start next level
         """
 
-        next_level = Level(self)
-        info_screen = InfoScreen(self, self.score, self.lives, next_level)
-        self.change_state(info_screen)
+        if options.reuse_states and self.level is not None:
+            self.level.reset()
+        else:
+            self.level = Level(self)
+
+        self.show_info(self.score, self.lives, self.level)
 
 
     def restart_level(self, next_level):
@@ -63,8 +84,18 @@ class YarsManager(GameManager):
 
         self.reset_energy()
         next_level.reset_positions()
-        info_screen = InfoScreen(self, self.score, self.lives, next_level)
-        self.change_state(info_screen)
+        self.show_info(self.score, self.lives, next_level)
+
+
+    def show_info(self, score, lives, next_state):
+        """Go to the intermediate screen showing score and lives, then to next_state"""
+
+        if options.reuse_states and self.info_screen is not None:
+            self.info_screen.reset(score, lives, next_state)
+        else:
+            self.info_screen = InfoScreen(self, score, lives, next_state)
+
+        self.change_state(self.info_screen)
 
 
     def kill_player(self, next_level):